@@ -1,204 +1,102 @@
 # app.py
+import hashlib
+import time
+import uuid
 import streamlit as st
-from utils.data_processor import DataProcessor
-from utils.chart_updater import ChartUpdater
-from utils.table_updater import TableUpdater
-from utils.file_handler import FileHandler
-from utils.historical_processor import HistoricalDataProcessor
-import pandas as pd
-import os
-from datetime import datetime
-import tempfile
+from config.settings import (
+    CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_POLL_SECONDS, PIPELINE_IN_MEMORY,
+    RAKING_TARGETS_PATH, STAGE_MEMO_MAX_ENTRIES,
+    WORKSPACE_ROOT, WORKSPACE_MAX_AGE_SECONDS, WORKSPACE_QUOTA_BYTES, WORKSPACE_SWEEP_SECONDS
+)
+from utils.file_handler import FileHandler, open_buffer
+from utils.job_manager import JobManager, ReportJob
+from utils.pipeline import UPLOAD_KEYS, run_report
+from utils.workspace import WorkspaceManager
 
-# Turkish month names dictionary
-TURKISH_MONTHS = {
-    1: 'Oca', 2: 'Şub', 3: 'Mar', 4: 'Nis', 
-    5: 'May', 6: 'Haz', 7: 'Tem', 8: 'Ağu',
-    9: 'Eyl', 10: 'Eki', 11: 'Kas', 12: 'Ara'
-}
+# Cached stages. Arguments prefixed with an underscore are not hashed by
+# Streamlit; the content hash passed alongside them is the cache key.
 
-def get_month_year_suffix():
-    now = datetime.now()
-    month = TURKISH_MONTHS[now.month]
-    year = str(now.year)[2:]  # Get last two digits of year
-    return f"{month}{year}"
+def content_hash(uploaded_file) -> str:
+    """Return the SHA-256 of an uploaded file's content"""
+    # getvalue() shares the upload's bytes; getbuffer() would force a private copy
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
 
-def process_survey_data(survey_file, tr_output_path, en_output_path, historical_file_path, table_template_path):
-    try:
-        # Initialize processors
-        file_handler = FileHandler()
-        data_processor = DataProcessor()
-        
-        # Initialize chart updaters for both languages
-        chart_updater_tr = ChartUpdater(tr_output_path, language='tr')
-        chart_updater_en = ChartUpdater(en_output_path, language='en')
-        
-        historical_processor = HistoricalDataProcessor(historical_file_path)
-        
-        # Create output paths for tables with month-year suffix
-        try:
-            print("Setting up table updaters...")
-            temp_dir = tempfile.gettempdir()
-            now = datetime.now()
-            month = TURKISH_MONTHS[now.month]
-            year = str(now.year)[2:]
-            month_year = f"{month}{year}"
-            
-            tr_table_output_path = os.path.join(temp_dir, f'Tables_{month_year}.xlsx')
-            en_table_output_path = os.path.join(temp_dir, f'Tables_{month_year}_en.xlsx')
-            print(f"Table outputs will be saved to: {tr_table_output_path} and {en_table_output_path}")
-            
-            # Initialize both Turkish and English table updaters
-            tr_table_updater = TableUpdater(table_template_path, tr_table_output_path, language='tr')
-            en_table_updater = TableUpdater(table_template_path, en_table_output_path, language='en')
-            print("Successfully initialized table updaters")
-        except Exception as e:
-            raise Exception(f"Error setting up table updaters: {str(e)}")
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_survey_frame(survey_hash: str, _survey_file):
+    """Parse the survey workbook"""
+    import pandas as pd
+    return pd.read_excel(open_buffer(_survey_file))
 
-        # Read and process survey data
-        try:
-            survey_df = pd.read_excel(survey_file)
-            print(f"Successfully read survey data with {len(survey_df)} rows")
-        except Exception as e:
-            raise Exception(f"Error reading survey file: {str(e)}")
-        
-        # Set the parti column from the survey question
-        try:
-            survey_df['parti'] = survey_df["Bu Pazar genel seçim olsa hangi partiye oy verirsiniz?"]
-            print("Successfully set parti column")
-        except Exception as e:
-            raise Exception(f"Error setting parti column: {str(e)}")
-        
-        processed_data = data_processor.process_survey_data(
-            survey_df,
-            "Bu Pazar genel seçim olsa hangi partiye oy verirsiniz?"
-        )
-        
-        # Create education column
-        def map_education(edu):
-            if edu in ['Doktora', 'Yüksek lisans', 'Yüksekokul veya üniversite mezunu']:
-                return 'Yüksekokul ve üzeri'
-            elif edu == 'Lise ve dengi meslek okulu mezunu':
-                return 'Lise'
-            else:
-                return 'İlköğretim ve altı'
-        
-        try:
-            survey_df['education'] = survey_df['En son mezun olduğunuz eğitim kurumunu belirtir misiniz? Halihazırda eğitiminize devam ediyorsanız lütfen şu anda devam ettiğiniz eğitim seviyesini belirtin.'].apply(map_education)
-            print("Successfully created education column")
-        except Exception as e:
-            raise Exception(f"Error creating education column: {str(e)}")
-        
-        # Create age group column
-        def map_age_group(age):
-            age = int(age)
-            if 18 <= age <= 34:
-                return '18-34'
-            elif 35 <= age <= 54:
-                return '35-54'
-            else:
-                return '55 ve üstü'
-        
-        try:
-            # Find the age column
-            age_col = historical_processor._find_column(survey_df, "Yaşınızı öğrenebilir miyim")
-            survey_df['age_group_second'] = survey_df[age_col].apply(map_age_group)
-            print("Successfully created age group column")
-        except Exception as e:
-            raise Exception(f"Error creating age group column: {str(e)}")
-        
-        # Process historical data
-        try:
-            historical_data = {}
-            
-            # Process party votes
-            historical_data['party_votes'] = historical_processor.process_party_votes(survey_df)
-            
-            # Process education breakdown
-            education_data = historical_processor.process_education_breakdown(survey_df)
-            historical_data.update(education_data)
-            
-            # Process age breakdown
-            age_data = historical_processor.process_age_breakdown(survey_df)
-            historical_data.update(age_data)
-            
-            # Process 2023 party data
-            historical_data['party_votes_2023'] = historical_processor.process_2023_party_breakdown(survey_df)
-            
-            # Process economic data
-            historical_data['econ_main'] = historical_processor.process_econ_main(survey_df)
-            historical_data['econ_negative_party'] = historical_processor.process_econ_negative_party(survey_df)
-            historical_data['econ_negative_age'] = historical_processor.process_econ_negative_age(survey_df)
-            historical_data['econ_negative_education'] = historical_processor.process_econ_negative_education(survey_df)
-            historical_data['econ_future_main'] = historical_processor.process_econ_future_main(survey_df)
-            historical_data['econ_future_party'] = historical_processor.process_econ_future_party(survey_df)
-            historical_data['econ_future_age'] = historical_processor.process_econ_future_age(survey_df)
-            
-            # Process politician success data
-            historical_data['current_success'] = historical_processor.process_politician_success(survey_df)
-            historical_data['politician_success_main'] = historical_processor.process_politician_success_main(survey_df)
-            historical_data['politician_success_second'] = historical_processor.process_politician_success_second(survey_df)
-            
-            # Process subsistence data
-            historical_data['subsistence'] = historical_processor.process_subsistence(survey_df)
-            historical_data['subsistence_party'] = historical_processor.process_subsistence_party(survey_df)
-            
-            print("Successfully processed historical data")
-        except Exception as e:
-            raise Exception(f"Error processing historical data: {str(e)}")
-        
-        # Save updated historical data
-        try:
-            for sheet_name, df in historical_data.items():
-                historical_processor.save_updated_data(df, sheet_name)
-            print("Successfully saved historical data")
-        except Exception as e:
-            raise Exception(f"Error saving historical data: {str(e)}")
-        
-        # Update all charts in both languages
-        try:
-            # Update Turkish version
-            chart_updater_tr.update_all_charts(processed_data, historical_data)
-            print("Successfully updated Turkish charts")
-            
-            # Update English version
-            chart_updater_en.update_all_charts(processed_data, historical_data)
-            print("Successfully updated English charts")
-        except Exception as e:
-            raise Exception(f"Error updating charts: {str(e)}")
-        
-        # Update tables in both languages
-        try:
-            print("Starting table updates...")
-            print("Updating Turkish tables...")
-            tr_table_updater.update_all_tables(survey_df)
-            print("Successfully updated Turkish tables")
-            
-            print("Updating English tables...")
-            en_table_updater.update_all_tables(survey_df)
-            print("Successfully updated English tables")
-        except Exception as e:
-            raise Exception(f"Error updating tables: {str(e)}")
-        
-        # Return both Turkish and English file paths along with other results
-        return True, "Data processed successfully", tr_table_output_path, en_table_output_path, historical_file_path, tr_output_path, en_output_path
-        
-    except Exception as e:
-        return False, f"Error processing data: {str(e)}", None, None, None, None, None
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_historical_sheets(historical_hash: str, _historical_file) -> dict:
+    """Parse every sheet of the historical workbook"""
+    import pandas as pd
+    return pd.read_excel(open_buffer(_historical_file), sheet_name=None)
 
-def main():
-    # Initialize session state for file paths if they don't exist
-    if 'tr_output_path' not in st.session_state:
-        st.session_state.tr_output_path = None
-    if 'en_output_path' not in st.session_state:
-        st.session_state.en_output_path = None
-    if 'tr_table_output_path' not in st.session_state:
-        st.session_state.tr_table_output_path = None
-    if 'en_table_output_path' not in st.session_state:
-        st.session_state.en_table_output_path = None
-    if 'historical_output_path' not in st.session_state:
-        st.session_state.historical_output_path = None
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def index_template_charts(template_hash: str, _template_file) -> dict:
+    """Map chart names in the PowerPoint template to their slides"""
+    from pptx import Presentation
+    from utils.chart_updater import ChartUpdater
+    return ChartUpdater.build_chart_index(Presentation(open_buffer(_template_file)))
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def generate_report(upload_hashes: tuple, _uploaded_files: dict, _progress=None, _work_dir: str = None) -> dict:
+    """Run the pipeline and return {output key: (file name, bytes)}"""
+    survey_hash, template_hash, historical_hash, _ = upload_hashes
+    return run_report(
+        _uploaded_files,
+        survey_df=load_survey_frame(survey_hash, _uploaded_files['survey']),
+        historical_sheets=load_historical_sheets(historical_hash, _uploaded_files['historical']),
+        chart_index=index_template_charts(template_hash, _uploaded_files['template']),
+        progress=_progress,
+        work_dir=_work_dir,
+        raking_targets=RAKING_TARGETS_PATH,
+        memo=get_stage_memo()
+    )
+
+def run_report_job(upload_hashes: tuple, uploaded_files: dict, session_id: str, progress=None) -> dict:
+    """Entry point executed on the worker pool"""
+    if PIPELINE_IN_MEMORY:
+        return generate_report(upload_hashes, uploaded_files, _progress=progress)
+    with get_workspace_manager().workspace(session_id) as work_dir:
+        return generate_report(upload_hashes, uploaded_files, _progress=progress, _work_dir=work_dir)
+
+@st.cache_resource
+def get_stage_memo():
+    """Stage outputs shared by every run, so a rerun only executes the stages whose inputs changed"""
+    from utils.stage_graph import StageMemo
+    return StageMemo(max_entries=STAGE_MEMO_MAX_ENTRIES)
+
+@st.cache_resource
+def get_workspace_manager() -> WorkspaceManager:
+    """Per-run workspaces shared by every session, with the janitor running in the background"""
+    workspace_manager = WorkspaceManager(
+        root=WORKSPACE_ROOT,
+        max_age_seconds=WORKSPACE_MAX_AGE_SECONDS,
+        quota_bytes=WORKSPACE_QUOTA_BYTES
+    )
+    workspace_manager.start_janitor(WORKSPACE_SWEEP_SECONDS)
+    return workspace_manager
 
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Worker pool shared by every session; jobs outlive reruns and page reloads"""
+    return JobManager(max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS)
+
+def show_job_progress(job: ReportJob):
+    """Render a queued or running job and poll until it finishes"""
+    if job.status == ReportJob.QUEUED:
+        st.info("⏳ Waiting for a free worker...")
+    else:
+        # Stages run concurrently and report in completion order, so the bar
+        # follows the share of completed stages rather than the last label
+        stage = job.current_stage
+        st.progress(job.fraction, text=f"{stage or 'Starting'}...")
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+def main():
     # Initialize FileHandler
     file_handler = FileHandler()
 
@@ -209,6 +107,12 @@ def main():
         layout="wide"
     )
 
+    # The running or last finished job is kept in the URL so it survives page reloads
+    job_manager = get_job_manager()
+    job_id = st.query_params.get('job')
+    if 'workspace_id' not in st.session_state:
+        st.session_state.workspace_id = uuid.uuid4().hex
+
     # Define path for table template
     table_template_path = "table_data/table_templates_main.xlsx"
 
@@ -238,74 +142,60 @@ def main():
     5. Click process to generate your report
     """)
 
-    # Process button and results
+    # Process button
     if all([survey_file, template_file, historical_file, table_template_file]):
         st.markdown("---")
         
         if st.button("🚀 Process Data", type="primary"):
             try:
-                # Create new processed files
-                template_path, tr_output_path, en_output_path = file_handler.create_processed_file(template_file)
-                
-                # Save historical file and get its path
-                historical_path = file_handler.save_uploaded_file(historical_file)
-                
-                # Save table template file and get its path
-                table_template_path = file_handler.save_uploaded_file(table_template_file)
-                
-                # Process the data
-                with st.spinner('Processing data...'):
-                    success, message, tr_table_output_path, en_table_output_path, historical_output_path, tr_output_path, en_output_path = process_survey_data(
-                        survey_file, 
-                        tr_output_path,  # Pass Turkish output path
-                        en_output_path,  # Pass English output path
-                        historical_path,
-                        table_template_path
-                    )
+                uploaded_files = {
+                    'survey': survey_file,
+                    'template': template_file,
+                    'historical': historical_file,
+                    'table_template': table_template_file
+                }
+                upload_hashes = tuple(content_hash(uploaded_files[key]) for key in UPLOAD_KEYS)
                 
-                if success:
-                    st.success(message)
-                    # Store paths in session state
-                    st.session_state.tr_output_path = tr_output_path
-                    st.session_state.en_output_path = en_output_path
-                    st.session_state.tr_table_output_path = tr_table_output_path
-                    st.session_state.en_table_output_path = en_table_output_path
-                    st.session_state.historical_output_path = historical_output_path
-                else:
-                    st.error(message)
-                    
+                # Identical uploads reuse the queued, running or finished job instead of starting a new run
+                job_id = job_manager.submit(
+                    run_report_job, upload_hashes, uploaded_files, st.session_state.workspace_id, key=upload_hashes
+                )
+                st.query_params['job'] = job_id
             except Exception as e:
                 st.error(f"Error processing files: {str(e)}")
-        
-        # Show download buttons if paths exist in session state
-        if (st.session_state.tr_output_path or st.session_state.en_output_path or 
-            st.session_state.tr_table_output_path or st.session_state.en_table_output_path or 
-            st.session_state.historical_output_path):
-            st.markdown("### Download Processed Files")
-            
-            # Create three columns for better organization
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown("#### 📊 Presentation Files")
-                if st.session_state.tr_output_path:
-                    file_handler.get_download_button(st.session_state.tr_output_path, "📥 Turkish PowerPoint (TR)")
-                if st.session_state.en_output_path:
-                    file_handler.get_download_button(st.session_state.en_output_path, "📥 English PowerPoint (EN)")
-            
-            with col2:
-                st.markdown("#### 📈 Excel Reports")
-                if st.session_state.tr_table_output_path:
-                    file_handler.get_download_button(st.session_state.tr_table_output_path, "📥 Turkish Tables")
-                if st.session_state.en_table_output_path:
-                    file_handler.get_download_button(st.session_state.en_table_output_path, "📥 English Tables")
-            
-            with col3:
-                st.markdown("#### 📚 Historical Data")
-                if st.session_state.historical_output_path:
-                    file_handler.get_download_button(st.session_state.historical_output_path, "📚 Updated Historical Data")
     else:
         st.info("👆 Please upload the survey data, PowerPoint template, and historical data files to begin processing")
 
+    # Job status and results
+    job = job_manager.get(job_id) if job_id else None
+    if job is None:
+        return
+    
+    if not job.finished:
+        show_job_progress(job)
+    elif job.status == ReportJob.FAILED:
+        st.error(f"Error processing data: {job.error}")
+    else:
+        st.success("Data processed successfully")
+        outputs = job.result
+        st.markdown("### Download Processed Files")
+        
+        # Create three columns for better organization
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown("#### 📊 Presentation Files")
+            file_handler.get_download_button(outputs['tr_output'][0], "📥 Turkish PowerPoint (TR)", data=outputs['tr_output'][1])
+            file_handler.get_download_button(outputs['en_output'][0], "📥 English PowerPoint (EN)", data=outputs['en_output'][1])
+        
+        with col2:
+            st.markdown("#### 📈 Excel Reports")
+            file_handler.get_download_button(outputs['tr_table_output'][0], "📥 Turkish Tables", data=outputs['tr_table_output'][1])
+            file_handler.get_download_button(outputs['en_table_output'][0], "📥 English Tables", data=outputs['en_table_output'][1])
+        
+        with col3:
+            st.markdown("#### 📚 Historical Data")
+            file_handler.get_download_button(outputs['historical_output'][0], "📚 Updated Historical Data", data=outputs['historical_output'][1])
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
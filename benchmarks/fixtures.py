@@ -0,0 +1,162 @@
+# benchmarks/fixtures.py
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.util import Inches
+from config.constants import PARTY_MAPPING, PARTY_PAIRS
+from utils.date_formatter import TurkishDateFormatter
+
+PARTIES = ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']
+EDUCATION_LEVELS = ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']
+AGE_GROUPS = ['18-34', '35-54', '55 ve üstü']
+PARTY_SUFFIXES = ['akp', 'chp', 'dem', 'iyip', 'mhp', 'kararsiz', 'absent']
+MAIN_POLITICIANS = ['Recep Tayyip Erdoğan', 'Özgür Özel', 'Devlet Bahçeli',
+                    'Ekrem İmamoğlu', 'Mansur Yavaş', 'Fatih Erbakan']
+SECOND_POLITICIANS = ['Muharrem İnce', 'Erkan Baş', 'Ümit Özdağ', 'Müsavat Dervişoğlu',
+                      'Tülay Hatimoğulları Oruç', 'Yavuz Ağıralioğlu', 'Mahmut Arıkan']
+SUBSISTENCE_RESPONSES = [
+    'Gelirim giderimi karşılamadı.',
+    'Gelirim giderimi ucu ucuna karşıladı.',
+    'Gelirim giderlerimin üzerinde oldu.',
+    'Gelirim giderlerimi fazlasıyla karşıladı.'
+]
+
+# Value columns of every monthly sheet maintained by HistoricalDataProcessor
+HISTORICAL_SHEET_COLUMNS = {
+    'party_votes': PARTIES + ['Kararsız', 'Oy Kullanmam', 'Diğer'],
+    **{f'party_votes_education_{suffix}': EDUCATION_LEVELS for suffix in PARTY_SUFFIXES},
+    **{f'party_votes_age_{suffix}': AGE_GROUPS for suffix in PARTY_SUFFIXES},
+    'party_votes_2023': PARTIES,
+    'econ_main': ['Çok kötü / Kötü', 'Ne iyi ne kötü', 'Çok İyi / İyi'],
+    'econ_negative_party': PARTIES,
+    'econ_negative_age': AGE_GROUPS,
+    'econ_negative_education': EDUCATION_LEVELS,
+    'econ_future_main': ['Çok Daha Kötü/Daha Kötü', 'Değişmez', 'Çok Daha İyi/Daha İyi'],
+    'econ_future_party': PARTIES,
+    'econ_future_age': AGE_GROUPS,
+    'politician_success_main': MAIN_POLITICIANS,
+    'politician_success_second': SECOND_POLITICIANS,
+    'subsistence': SUBSISTENCE_RESPONSES,
+    'subsistence_party': PARTIES
+}
+
+# Charts looked up by shape name in ChartUpdater
+NAMED_CHARTS = (
+    [f'education_{suffix}' for suffix in PARTY_SUFFIXES] +
+    [f'age_{suffix}' for suffix in PARTY_SUFFIXES] +
+    ['2023_party',
+     'econ_main', 'econ_negative_party', 'econ_negative_age', 'econ_negative_education',
+     'econ_future_main', 'econ_future_party', 'econ_future_age',
+     'politician_success', 'politician_success_main', 'politician_success_second',
+     'subsistence', 'subsistence_party']
+)
+
+
+VOTE_QUESTION = 'Bu Pazar genel seçim olsa hangi partiye oy verirsiniz?'
+
+
+def month_labels(months: int, end: datetime = None) -> List[str]:
+    """Return `months` consecutive Turkish month labels (e.g. 'Oca.24') ending at `end`"""
+    if end is None:
+        end = datetime.now()
+    labels = []
+    year, month = end.year, end.month
+    for _ in range(months):
+        labels.append(TurkishDateFormatter.format_date(datetime(year, month, 1)))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return labels[::-1]
+
+
+def build_historical_frames(months: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Build every historical sheet with `months` rows of random percentages"""
+    rng = np.random.default_rng(seed)
+    labels = month_labels(months)
+    frames = {}
+    for sheet_name, columns in HISTORICAL_SHEET_COLUMNS.items():
+        values = rng.uniform(1, 60, size=(months, len(columns))).round(2)
+        if sheet_name.startswith('politician_success'):
+            values = rng.uniform(1, 10, size=(months, len(columns))).round(1)
+        df = pd.DataFrame(values, columns=columns)
+        df.insert(0, 'Months', labels)
+        frames[sheet_name] = df
+    frames['current_success'] = build_current_success(seed)
+    return frames
+
+
+def build_current_success(seed: int = 0) -> pd.DataFrame:
+    """Build the current month's politician success frame"""
+    rng = np.random.default_rng(seed)
+    politicians = MAIN_POLITICIANS + SECOND_POLITICIANS
+    rates = rng.uniform(1, 10, size=len(politicians)).round(1)
+    return pd.DataFrame({'Politician': politicians, 'Success Rate': rates})
+
+
+def build_party_data(seed: int = 0) -> Dict[str, float]:
+    """Build headline party percentages in the shape DataProcessor returns"""
+    rng = np.random.default_rng(seed)
+    parties = PARTIES + ['Kararsızım', 'Oy kullanmayacağım', 'Diğer']
+    shares = rng.dirichlet(np.ones(len(parties))) * 100
+    return {party: round(float(share), 1) for party, share in zip(parties, shares)}
+
+
+def build_vote_panel(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build a survey frame of `rows` headline vote answers with random weights"""
+    rng = np.random.default_rng(seed)
+    answers = np.array(list(PARTY_MAPPING) + ['Diğer', None], dtype=object)
+    return pd.DataFrame({
+        VOTE_QUESTION: rng.choice(answers, size=rows),
+        'duzeltilmis_agirlik': rng.uniform(0.2, 3.0, size=rows)
+    })
+
+
+def build_historical_workbook(path: str, months: int, seed: int = 0) -> str:
+    """Write a historical workbook with `months` rows per sheet to `path`"""
+    frames = build_historical_frames(months, seed)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for sheet_name, df in frames.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return path
+
+
+def _add_chart(slide, name: str, chart_type=XL_CHART_TYPE.LINE):
+    """Add a small placeholder chart named `name` to the slide"""
+    chart_data = CategoryChartData()
+    chart_data.categories = ['Oca.24', 'Şub.24']
+    chart_data.add_series('Series 1', [1.0, 2.0])
+    graphic_frame = slide.shapes.add_chart(
+        chart_type, Inches(0.5), Inches(0.5), Inches(6), Inches(4), chart_data
+    )
+    graphic_frame.name = name
+    return graphic_frame
+
+
+def build_template(path: str) -> str:
+    """Write a PowerPoint template with every chart ChartUpdater expects to `path`"""
+    prs = Presentation()
+    layout = prs.slide_layouts[6]  # Blank
+
+    # Positional slides: 1-14 are text only, 15 holds the party bar chart,
+    # 16-18 hold one time series chart per party pair
+    last_pair_slide = max(PARTY_PAIRS)
+    for slide_number in range(1, last_pair_slide + 1):
+        slide = prs.slides.add_slide(layout)
+        if slide_number == 15:
+            _add_chart(slide, 'Chart 1', XL_CHART_TYPE.BAR_CLUSTERED)
+        elif slide_number in PARTY_PAIRS:
+            for i, _ in enumerate(PARTY_PAIRS[slide_number]):
+                _add_chart(slide, f'Chart {i + 1}', XL_CHART_TYPE.AREA)
+
+    # Named charts, one per slide
+    for name in NAMED_CHARTS:
+        slide = prs.slides.add_slide(layout)
+        chart_type = XL_CHART_TYPE.BAR_CLUSTERED if name == 'politician_success' else XL_CHART_TYPE.LINE
+        _add_chart(slide, name, chart_type)
+
+    prs.save(path)
+    return path
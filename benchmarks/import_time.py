@@ -0,0 +1,78 @@
+# benchmarks/import_time.py
+"""
+Import-time regression check based on `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter. The check fails (exit
+code 1) when the cumulative import time exceeds its budget or when a heavy
+library that should be loaded lazily shows up at import time.
+
+Usage:
+    python -m benchmarks.import_time [--scale 2.0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'pptx', 'matplotlib', 'seaborn']
+
+# module -> (budget in milliseconds, heavy modules allowed at import time)
+BUDGETS = {
+    'cli': (150, []),
+    'utils.pipeline': (150, []),
+    'utils.file_handler': (150, []),
+    'app': (1500, []),  # includes streamlit itself
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """Import module in a fresh interpreter; return (total ms, top-level packages imported)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    total_us = 0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level entries are not indented; nested imports are already in their parent's cumulative time
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+        packages.add(name.strip().split('.')[0])
+    return total_us / 1000, sorted(packages)
+
+
+def check(budgets: Dict[str, Tuple[float, List[str]]], scale: float = 1.0) -> bool:
+    ok = True
+    for module, (budget_ms, allowed) in budgets.items():
+        elapsed_ms, packages = measure(module)
+        eager = [name for name in HEAVY_MODULES if name in packages and name not in allowed]
+        within_budget = elapsed_ms <= budget_ms * scale
+        status = 'ok' if within_budget and not eager else 'FAIL'
+        print(f"{status:>4}  {module:<20} {elapsed_ms:>8.1f} ms (budget {budget_ms * scale:.0f} ms)")
+        if eager:
+            print(f"      eagerly imports: {', '.join(eager)}")
+        ok = ok and status == 'ok'
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time of the app entry points")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args()
+    sys.exit(0 if check(BUDGETS, args.scale) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/render_scale.py
+"""
+Measure how historical load, chart update and historical save scale with
+the number of months in the historical workbook.
+
+Usage:
+    python -m benchmarks.render_scale --months 12 60 120 240 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.fixtures import (
+    build_current_success,
+    build_historical_workbook,
+    build_party_data,
+    build_template
+)
+from utils.chart_updater import ChartUpdater
+from utils.historical_processor import HistoricalDataProcessor
+from utils.pipeline import read_historical_stage
+
+DEFAULT_MONTHS = [12, 24, 60, 120, 240]
+
+
+def _timed(func, *args, **kwargs):
+    """Run func with its console output suppressed and return (result, seconds)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _load_historical(historical_path: str) -> Dict:
+    """Read every historical sheet the way the pipeline does, in one read_excel call"""
+    historical_data = read_historical_stage(historical_path)
+    historical_data['current_success'] = build_current_success()
+    return historical_data
+
+
+def _save_historical(processor: HistoricalDataProcessor, historical_data: Dict):
+    """Save every historical sheet the way the pipeline does"""
+    processor.save_all(historical_data)
+
+
+def run_once(work_dir: str, template_path: str, months: int) -> Dict[str, float]:
+    """Run load, chart update and save once for a workbook with `months` rows"""
+    historical_path = os.path.join(work_dir, f'historical_{months}.xlsx')
+    deck_path = os.path.join(work_dir, f'deck_{months}.pptx')
+    build_historical_workbook(historical_path, months)
+    shutil.copy2(template_path, deck_path)
+
+    processor = HistoricalDataProcessor(historical_path)
+    historical_data, load_time = _timed(_load_historical, historical_path)
+
+    chart_updater = ChartUpdater(deck_path, language='tr')
+    _, chart_time = _timed(chart_updater.update_all_charts, build_party_data(), historical_data)
+
+    _, save_time = _timed(_save_historical, processor, historical_data)
+
+    return {
+        'load': load_time,
+        'charts': chart_time,
+        'save': save_time,
+        'deck_kb': os.path.getsize(deck_path) / 1024,
+        'workbook_kb': os.path.getsize(historical_path) / 1024
+    }
+
+
+def run(months_list: List[int], repeat: int = 1) -> List[Dict[str, float]]:
+    """Run the benchmark for each history length and return the best timings"""
+    rows = []
+    work_dir = tempfile.mkdtemp(prefix='render_scale_')
+    try:
+        template_path = build_template(os.path.join(work_dir, 'template.pptx'))
+        for months in months_list:
+            runs = [run_once(work_dir, template_path, months) for _ in range(repeat)]
+            best = {key: min(r[key] for r in runs) for key in runs[0]}
+            best['months'] = months
+            rows.append(best)
+            print(
+                f"{months:>6} {best['load']:>9.3f} {best['charts']:>9.3f} {best['save']:>9.3f}"
+                f" {best['deck_kb']:>10.1f} {best['workbook_kb']:>12.1f}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart and historical save scaling benchmark")
+    parser.add_argument('--months', type=int, nargs='+', default=DEFAULT_MONTHS,
+                        help="History lengths to benchmark (12 to 240 months)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per history length; best is reported")
+    args = parser.parse_args()
+
+    print(f"{'months':>6} {'load (s)':>9} {'charts':>9} {'save':>9} {'deck (KB)':>10} {'history (KB)':>12}")
+    run(args.months, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
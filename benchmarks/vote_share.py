@@ -0,0 +1,50 @@
+# benchmarks/vote_share.py
+"""
+Micro-benchmark of the headline vote-share kernel
+(DataProcessor.process_survey_data) on growing survey panels.
+
+The time per row should stay flat as the panel grows: the answers are
+encoded once and only the distinct answers are mapped to parties.
+
+Usage:
+    python -m benchmarks.vote_share --rows 1000 10000 100000 1000000 --repeat 5
+"""
+import argparse
+import time
+from typing import Dict, List
+from benchmarks.fixtures import VOTE_QUESTION, build_vote_panel
+from utils.data_processor import DataProcessor
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def run_once(survey_df) -> float:
+    """Compute the headline shares once and return the elapsed seconds"""
+    start = time.perf_counter()
+    DataProcessor.process_survey_data(survey_df, VOTE_QUESTION)
+    return time.perf_counter() - start
+
+
+def run(rows_list: List[int], repeat: int = 3) -> List[Dict[str, float]]:
+    """Run the benchmark for each panel size and return the best timings"""
+    results = []
+    for rows in rows_list:
+        survey_df = build_vote_panel(rows)
+        best = min(run_once(survey_df) for _ in range(repeat))
+        results.append({'rows': rows, 'seconds': best, 'ns_per_row': best / rows * 1e9})
+        print(f"{rows:>10} {best * 1000:>10.2f} {best / rows * 1e9:>10.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headline vote-share kernel benchmark")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Panel sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per panel size; best is reported")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'time (ms)':>10} {'ns/row':>10}")
+    run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
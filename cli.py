@@ -0,0 +1,168 @@
+# cli.py
+"""
+Headless entry point for batch and scheduled report runs.
+
+Usage:
+    python -m cli --survey survey.xlsx --template report.pptx \\
+        --historical historical.xlsx --output-dir out/
+
+Backfill several months in one run (templates and historical data are loaded
+once, months are appended in order and outputs are written at the end):
+    python -m cli --wave 2024-01 jan.xlsx --wave 2024-02 feb.xlsx \\
+        --template report.pptx --historical historical.xlsx --output-dir out/
+
+Add --raking-targets targets.json to recompute the survey weights by raking
+to population margins (see utils.pipeline.RAKING_DIMENSIONS) instead of
+using the uploaded duzeltilmis_agirlik, and --margins to print bootstrap confidence intervals of the party shares of
+the latest wave, overall and by age group and education.
+
+Add --store history.db to upsert the new months of every historical sheet
+into a SQLite store that python -m query_historical can query.
+
+Streamlit is never imported, so runs start fast and several waves can be
+processed in parallel as long as each one writes to its own output directory.
+"""
+import argparse
+import os
+import shutil
+import sys
+from datetime import datetime
+
+DEFAULT_TABLE_TEMPLATE = os.path.join('table_data', 'table_templates_main.xlsx')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate the Türkiye Raporu decks and tables without the web app")
+    surveys = parser.add_mutually_exclusive_group(required=True)
+    surveys.add_argument('--survey', help="Survey data Excel file (current month)")
+    surveys.add_argument('--wave', nargs=2, action='append', metavar=('YYYY-MM', 'SURVEY'),
+                         help="Month and survey file of one wave to backfill; repeat in chronological order")
+    parser.add_argument('--template', required=True, help="PowerPoint template (previous month's deck)")
+    parser.add_argument('--historical', required=True, help="Historical data Excel file (previous month)")
+    parser.add_argument('--table-template', default=DEFAULT_TABLE_TEMPLATE, help="Table template Excel file")
+    parser.add_argument('--output-dir', default='output', help="Directory that receives all outputs")
+    parser.add_argument('--compression', choices=['fast', 'balanced', 'small'], default=None,
+                        help="Repack the outputs with this compression policy (e.g. small for archival exports)")
+    parser.add_argument('--store', default=None,
+                        help="SQLite store that receives the updated historical sheets (default: HISTORICAL_STORE_PATH)")
+    parser.add_argument('--raking-targets', help="JSON file of target margins; recompute the weights by raking")
+    parser.add_argument('--margins', action='store_true', help="Print bootstrap margins of error of the party shares")
+    parser.add_argument('--replicates', type=int, default=None, help="Bootstrap resamples for --margins")
+    return parser
+
+
+def prepare_outputs(template_path: str, historical_path: str, output_dir: str) -> tuple:
+    """Copy the template and historical workbook into output_dir and return the output paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    name_without_ext, ext = os.path.splitext(os.path.basename(template_path))
+    tr_output_path = os.path.join(output_dir, f'{name_without_ext}{ext}')
+    en_output_path = os.path.join(output_dir, f'{name_without_ext}_en{ext}')
+    historical_output_path = os.path.join(output_dir, os.path.basename(historical_path))
+
+    # The historical workbook is updated in place, so never touch the caller's copy
+    for source, destination in [
+        (template_path, tr_output_path),
+        (template_path, en_output_path),
+        (historical_path, historical_output_path)
+    ]:
+        if os.path.abspath(source) != os.path.abspath(destination):
+            shutil.copy2(source, destination)
+
+    return tr_output_path, en_output_path, historical_output_path
+
+
+def parse_waves(wave_args: list) -> list:
+    """Turn [[YYYY-MM, path], ...] into [(datetime, path), ...]"""
+    waves = []
+    for month, path in wave_args:
+        try:
+            waves.append((datetime.strptime(month, '%Y-%m'), path))
+        except ValueError:
+            raise ValueError(f"invalid month '{month}', expected YYYY-MM")
+    return waves
+
+
+def print_margins(survey_path: str, replicates: int = None, raking_targets: str = None):
+    """Print bootstrap confidence intervals of the party shares, overall and by subgroup"""
+    import pandas as pd
+    from config.settings import BOOTSTRAP_REPLICATES, BOOTSTRAP_CONFIDENCE, BOOTSTRAP_MAX_CELLS, BOOTSTRAP_WORKERS
+    from utils.bootstrap import WeightedBootstrap
+    from utils.data_processor import DataProcessor
+    from utils.historical_processor import HistoricalDataProcessor
+    from utils.pipeline import prepare_survey_frame
+
+    bootstrap = WeightedBootstrap(
+        replicates=replicates or BOOTSTRAP_REPLICATES,
+        confidence=BOOTSTRAP_CONFIDENCE,
+        max_cells=BOOTSTRAP_MAX_CELLS,
+        max_workers=BOOTSTRAP_WORKERS
+    )
+    survey_df, _ = prepare_survey_frame(
+        survey_path, DataProcessor(), HistoricalDataProcessor(None, sheets={}), raking_targets=raking_targets
+    )
+    question = 'parti'
+    intervals = {'All respondents': DataProcessor.party_share_intervals(survey_df, question, bootstrap=bootstrap)}
+    intervals.update(DataProcessor.party_share_intervals(
+        survey_df, question, bootstrap=bootstrap,
+        subgroups={'Age group': 'age_group_second', 'Education': 'education'}
+    ))
+
+    print(f"\nParty shares with {bootstrap.confidence:.0%} bootstrap intervals ({bootstrap.replicates} resamples)")
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        for name, frame in intervals.items():
+            print(f"\n{name}\n{frame}")
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        waves = parse_waves(args.wave) if args.wave else [(None, args.survey)]
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+
+    inputs = [survey for _, survey in waves] + [args.template, args.historical, args.table_template]
+    if args.raking_targets:
+        inputs.append(args.raking_targets)
+    for path in inputs:
+        if not os.path.exists(path):
+            print(f"Error: file not found: {path}", file=sys.stderr)
+            return 2
+
+    from utils.pipeline import process_survey_waves
+
+    tr_output_path, en_output_path, historical_output_path = prepare_outputs(
+        args.template, args.historical, args.output_dir
+    )
+    success, message, *output_paths = process_survey_waves(
+        waves,
+        tr_output_path,
+        en_output_path,
+        historical_output_path,
+        args.table_template,
+        output_dir=args.output_dir,
+        raking_targets=args.raking_targets,
+        compression=args.compression,
+        historical_store=args.store
+    )
+
+    if not success:
+        print(message, file=sys.stderr)
+        return 1
+
+    print(message)
+    for path in output_paths:
+        print(f"  {path}")
+
+    if args.margins:
+        try:
+            print_margins(waves[-1][1], args.replicates, args.raking_targets)
+        except Exception as e:
+            print(f"Error computing margins of error: {str(e)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
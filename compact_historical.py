@@ -0,0 +1,53 @@
+# compact_historical.py
+"""
+Move old months of the historical workbook into a compressed archive workbook.
+
+Usage:
+    python -m compact_historical historical.xlsx --archive historical_archive.xlsx [--horizon 36]
+
+Rows older than the horizon (counted back from the latest month in the
+workbook) are appended to the archive and removed from the working
+workbook, so monthly runs only read and write recent months. Rebuild the
+full series into a single workbook with:
+    python -m compact_historical historical.xlsx --archive historical_archive.xlsx --merge full.xlsx
+"""
+import argparse
+import os
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Archive old months of the historical workbook")
+    parser.add_argument('historical', help="Working historical workbook")
+    parser.add_argument('--archive', required=True, help="Archive workbook receiving the old months")
+    parser.add_argument('--horizon', type=int, default=None, help="Months kept in the working workbook")
+    parser.add_argument('--merge', metavar='OUTPUT', help="Write the full series (archive + working) to OUTPUT instead")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if not os.path.isfile(args.historical):
+        print(f"Error: file not found: {args.historical}", file=sys.stderr)
+        return 2
+
+    from config.settings import HISTORICAL_HOT_MONTHS, HISTORICAL_ARCHIVE_COMPRESSION
+    from utils.historical_archive import compact_historical, load_full_history, write_sheets
+
+    try:
+        if args.merge:
+            sheets = load_full_history(args.historical, args.archive)
+            write_sheets(args.merge, sheets)
+            print(f"Saved the full series of {len(sheets)} sheets to {args.merge}")
+        else:
+            compact_historical(args.historical, args.archive, args.horizon or HISTORICAL_HOT_MONTHS,
+                               compression=HISTORICAL_ARCHIVE_COMPRESSION)
+    except Exception as e:
+        print(f"Error compacting historical data: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# config/settings.py
+
+# Streamlit cache limits for parsed uploads and generated reports.
+# Entries are keyed by content hashes of the uploads and evicted after the TTL
+# or once max entries is reached (least recently used first).
+CACHE_TTL_SECONDS = 60 * 60
+CACHE_MAX_ENTRIES = 8
+
+# Background report jobs: size of the worker pool shared by all sessions, how
+# long finished jobs (and their output bytes) are kept, and how often the page
+# polls a running job for progress.
+JOB_WORKERS = 2
+JOB_RETENTION_SECONDS = 60 * 60
+JOB_POLL_SECONDS = 1.0
+
+# Pipeline stage outputs kept between runs (parsed survey, historical
+# aggregates, rendered decks and tables), keyed by hashes of their inputs.
+# A rerun with one changed upload only executes the stages downstream of it.
+# Each run stores up to 10 entries; least recently used entries go first.
+STAGE_MEMO_MAX_ENTRIES = 40
+
+# Threads running independent pipeline stages at the same time (historical
+# save, TR/EN charts and TR/EN tables once the aggregates are ready). None
+# uses one per CPU; 1 runs the stages one after another.
+PIPELINE_STAGE_WORKERS = None
+
+# Rolling display window of the time-series charts, in months. None plots
+# the whole history; the historical workbook always keeps every month.
+# CHART_WINDOWS overrides it per historical sheet (every chart drawn from
+# that sheet), e.g. {'party_votes': 36, 'econ_main': 24}.
+CHART_WINDOW_MONTHS = None
+CHART_WINDOWS = {}
+
+# Hot/cold split of the historical workbook (python -m compact_historical):
+# months older than HISTORICAL_HOT_MONTHS move to an archive workbook
+# repacked with HISTORICAL_ARCHIVE_COMPRESSION, so monthly runs only load
+# recent months. Keep it at least as long as the longest chart window.
+HISTORICAL_HOT_MONTHS = 36
+HISTORICAL_ARCHIVE_COMPRESSION = 'small'
+
+# SQLite store of the historical series (see utils.historical_store). When
+# set, every run upserts its new months into it (a sheet not stored yet is
+# written in full) so the history can be queried with python -m
+# query_historical; None keeps the workbook only.
+HISTORICAL_STORE_PATH = None
+
+# Compression policy of the output decks and workbooks: None keeps the
+# packages as python-pptx/openpyxl write them (fastest). 'fast', 'balanced'
+# or 'small' repacks them, storing compressed media and deflating XML at
+# level 1, 6 or 9; 'small' suits archival exports. Parts are compressed on
+# up to the given number of threads (None: one per CPU).
+OUTPUT_COMPRESSION = None
+OUTPUT_COMPRESSION_WORKERS = None
+
+# Reports are built entirely in memory: uploads are read through views of their
+# bytes and outputs go straight to the download buttons. Set to False to route
+# files through a per-run workspace on disk instead (lower peak memory for
+# very large workbooks).
+PIPELINE_IN_MEMORY = True
+
+# Bootstrap margins of error for the party shares (cli.py --margins): number
+# of resamples, confidence level of the intervals, and the largest resample
+# count matrix (rows x replicates) built at once. Workers > 1 spreads the
+# replicate blocks over processes.
+BOOTSTRAP_REPLICATES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_MAX_CELLS = 5_000_000
+BOOTSTRAP_WORKERS = None
+
+# Raking of the survey weights (duzeltilmis_agirlik) to population margins.
+# None uses the weights in the uploaded survey; otherwise the path of a JSON
+# file mapping dimensions (see utils.pipeline.RAKING_DIMENSIONS) to category
+# shares, e.g. {"gender": {"Kadın": 50.2, "Erkek": 49.8}}. Raking stops once
+# every margin is within the tolerance (as a share) or after max iterations.
+RAKING_TARGETS_PATH = None
+RAKING_MAX_ITERATIONS = 100
+RAKING_TOLERANCE = 1e-6
+
+# Per-run workspaces for uploaded and generated files. None keeps them under
+# the system temp directory. Leftovers older than the max age are evicted, and
+# the oldest inactive workspaces go first once the quota is exceeded.
+WORKSPACE_ROOT = None
+WORKSPACE_MAX_AGE_SECONDS = 6 * 60 * 60
+WORKSPACE_QUOTA_BYTES = 2 * 1024 ** 3
+WORKSPACE_SWEEP_SECONDS = 5 * 60
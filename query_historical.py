@@ -0,0 +1,79 @@
+# query_historical.py
+"""
+Query the SQLite store of historical series without opening Excel.
+
+Usage:
+    python -m query_historical history.db party_votes_age_chp --columns 18-34 --since 2022-01
+
+Seed the store from a workbook, or export it back to the workbook layout:
+    python -m query_historical history.db --import historical.xlsx
+    python -m query_historical history.db --export historical.xlsx
+
+Without a sheet the stored sheets are listed.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Query the historical series store")
+    parser.add_argument('store', help="SQLite store (see HISTORICAL_STORE_PATH)")
+    parser.add_argument('sheet', nargs='?', help="Sheet to read, e.g. party_votes or party_votes_age_chp")
+    parser.add_argument('--columns', nargs='+', help="Series to show (default: all)")
+    parser.add_argument('--since', help="First month to show, YYYY-MM")
+    parser.add_argument('--until', help="Last month to show, YYYY-MM")
+    parser.add_argument('--import', dest='import_path', metavar='WORKBOOK', help="Upsert every sheet of WORKBOOK")
+    parser.add_argument('--export', metavar='WORKBOOK', help="Write the stored sheets to WORKBOOK")
+    return parser
+
+
+def parse_month(month: str) -> datetime:
+    try:
+        return datetime.strptime(month, '%Y-%m') if month else None
+    except ValueError:
+        raise ValueError(f"invalid month '{month}', expected YYYY-MM")
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        since, until = parse_month(args.since), parse_month(args.until)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    if args.import_path and not os.path.isfile(args.import_path):
+        print(f"Error: file not found: {args.import_path}", file=sys.stderr)
+        return 2
+
+    import pandas as pd
+    from utils.historical_store import HistoricalStore
+
+    try:
+        store = HistoricalStore(args.store)
+        if args.import_path:
+            store.import_workbook(args.import_path)
+            print(f"Imported {args.import_path} into {args.store}")
+        if args.export:
+            store.export_workbook(args.export)
+            print(f"Exported {len(store.sheet_names())} sheets to {args.export}")
+        if args.sheet:
+            if args.sheet not in store.sheet_names():
+                print(f"Error: no sheet {args.sheet} in {args.store}", file=sys.stderr)
+                return 2
+            df = store.read_sheet(args.sheet, columns=args.columns, start=since, end=until)
+            with pd.option_context('display.max_rows', None, 'display.width', 120):
+                print(df.to_string(index=False))
+        elif not (args.import_path or args.export):
+            for sheet_name in store.sheet_names():
+                print(sheet_name)
+    except Exception as e:
+        print(f"Error querying historical store: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
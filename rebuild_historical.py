@@ -0,0 +1,44 @@
+# rebuild_historical.py
+"""
+Rebuild the historical workbook from an archive of raw monthly survey files.
+
+Usage:
+    python -m rebuild_historical waves/ --output historical.xlsx [--workers 4]
+
+Every file in waves/ must carry its month in the name (e.g. survey_2024-03.xlsx).
+Waves are processed in parallel worker processes and merged by month, so
+mapping changes can be applied to every past month in a single run.
+"""
+import argparse
+import os
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Recompute all historical sheets from raw monthly survey files")
+    parser.add_argument('waves_dir', help="Directory with one survey Excel file per month")
+    parser.add_argument('--output', required=True, help="Historical workbook to write")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if not os.path.isdir(args.waves_dir):
+        print(f"Error: directory not found: {args.waves_dir}", file=sys.stderr)
+        return 2
+
+    from utils.historical_rebuild import find_waves, rebuild_historical
+
+    try:
+        waves = find_waves(args.waves_dir)
+        rebuild_historical(waves, args.output, max_workers=args.workers)
+    except Exception as e:
+        print(f"Error rebuilding historical data: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
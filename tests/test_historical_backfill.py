@@ -0,0 +1,58 @@
+# tests/test_historical_backfill.py
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from utils import pipeline
+from utils.date_formatter import TurkishDateFormatter
+
+
+def fake_compute_historical_data(survey_df, historical_processor):
+    """Append the wave's share to party_votes the way the real processors append their rows"""
+    df = historical_processor.read_historical_data('party_votes')
+    df.loc[len(df)] = [TurkishDateFormatter.format_date(historical_processor.report_date), survey_df['share'].iloc[0]]
+    return {'party_votes': df, 'current_success': pd.DataFrame({'Politician': ['A'], 'Success Rate': [5.0]})}
+
+
+@pytest.fixture(autouse=True)
+def fake_processors(monkeypatch):
+    monkeypatch.setattr(pipeline, 'compute_historical_data', fake_compute_historical_data)
+
+
+def run_waves(sheets, waves):
+    prepared = [(pd.DataFrame({'share': [share]}), {}) for _, share in waves]
+    options = {'months': [month for month, _ in waves], 'raking_targets': None}
+    return pipeline.historical_data_stage(prepared, [None] * len(waves), sheets, options)
+
+
+def workbook():
+    return {
+        'party_votes': pd.DataFrame({'Months': ['Ağu.26', 'Eyl.26', 'Eki.26'], 'CHP': [1.0, 2.0, 3.0]}),
+        'current_success': pd.DataFrame({'Politician': ['A'], 'Success Rate': [4.0]})
+    }
+
+
+def test_backfilling_existing_month_replaces_it_in_place():
+    result = run_waves(workbook(), [(datetime(2026, 9, 1), 20.0)])
+    assert result['party_votes']['Months'].tolist() == ['Ağu.26', 'Eyl.26', 'Eki.26']
+    assert result['party_votes']['CHP'].tolist() == [1.0, 20.0, 3.0]
+
+
+def test_backfill_is_repeatable():
+    waves = [(datetime(2026, 9, 1), 20.0), (datetime(2026, 10, 1), 30.0)]
+    once = run_waves(workbook(), waves)
+    twice = run_waves(dict(once), waves)
+    assert once['party_votes'].equals(twice['party_votes'])
+    assert twice['party_votes']['Months'].tolist() == ['Ağu.26', 'Eyl.26', 'Eki.26']
+
+
+def test_new_month_is_appended():
+    result = run_waves(workbook(), [(datetime(2026, 10, 1), 30.0), (datetime(2026, 11, 1), 40.0)])
+    assert result['party_votes']['Months'].tolist() == ['Ağu.26', 'Eyl.26', 'Eki.26', 'Kas.26']
+    assert result['party_votes']['CHP'].tolist() == [1.0, 2.0, 30.0, 40.0]
+
+
+def test_new_month_before_the_workbook_end_is_rejected():
+    with pytest.raises(Exception, match='already ends at Eki.26'):
+        run_waves(workbook(), [(datetime(2026, 7, 1), 10.0)])
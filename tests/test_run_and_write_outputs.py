@@ -0,0 +1,43 @@
+# tests/test_run_and_write_outputs.py
+import pytest
+
+from utils.pipeline import run_and_write_outputs
+from utils.stage_graph import StageGraph, run_blocking, value_digest
+
+
+def build_graph(fail: bool = False):
+    def report(data):
+        if fail:
+            raise Exception("Error building report")
+        return data.encode('utf-8')
+
+    graph = StageGraph()
+    graph.add_input('data', 'new', value_digest('new'))
+    graph.add_stage('rows', lambda data: [data], ['data'])
+    graph.add_stage('report', report, ['data'])
+    return graph
+
+
+def test_after_commit_runs_once_outputs_are_in_place(tmp_path):
+    destination = tmp_path / 'report.txt'
+    destination.write_bytes(b'old')
+    seen = []
+
+    def step(rows):
+        seen.append((rows, destination.read_bytes()))
+
+    run_blocking(run_and_write_outputs(build_graph(), {'report': str(destination)}, after_commit={'rows': step}))
+    assert seen == [(['new'], b'new')]
+
+
+def test_after_commit_is_skipped_when_a_stage_fails(tmp_path):
+    destination = tmp_path / 'report.txt'
+    destination.write_bytes(b'old')
+    seen = []
+
+    with pytest.raises(Exception, match='Error building report'):
+        run_blocking(run_and_write_outputs(build_graph(fail=True), {'report': str(destination)},
+                                           after_commit={'rows': seen.append}))
+    assert seen == []
+    assert destination.read_bytes() == b'old'
+    assert [path.name for path in tmp_path.iterdir()] == ['report.txt']
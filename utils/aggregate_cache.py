@@ -0,0 +1,128 @@
+# utils/aggregate_cache.py
+import threading
+from typing import Callable, Dict, Hashable, Tuple
+import numpy as np
+import pandas as pd
+
+class AggregateCache:
+    """
+    Memo of derived survey columns and weighted aggregates of one survey frame.
+
+    Processors describe what they need by (column, mapping, filter, dimension)
+    instead of writing helper columns into the survey frame, so the same
+    mapped column, row mask or weighted pivot is computed once no matter how
+    many processors ask for it. The pipeline builds one cache per wave in its
+    aggregates stage; the stage memo keeps it alive as long as that wave's
+    output, so later runs over the same survey reuse it, and the historical
+    and table stages read it from several threads at once. Access to the
+    store is therefore locked; values are computed outside the lock (two
+    threads may compute the same key, the first result is kept) and are
+    shared, so callers must not modify them.
+
+    A filter is a (column, mapping, values) tuple selecting the rows whose
+    mapped value is in values, or (column, mapping, values, True) selecting
+    the rows whose mapped value is not. mapping may be None to use the raw
+    column.
+    """
+    def __init__(self, survey_data: pd.DataFrame, weight_column: str = 'duzeltilmis_agirlik'):
+        self.survey_data = survey_data
+        self.weight_column = weight_column
+        self._store: Dict[Hashable, object] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_frame(cls, cache: 'AggregateCache', survey_data: pd.DataFrame) -> 'AggregateCache':
+        """Return cache if it was built for survey_data, otherwise a fresh cache for it"""
+        if cache is not None and cache.survey_data is survey_data:
+            return cache
+        return cls(survey_data)
+
+    def get(self, key: Hashable, compute: Callable):
+        """Return the value stored under key, computing and storing it on first use"""
+        with self._lock:
+            if key in self._store:
+                self.hits += 1
+                return self._store[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            return self._store.setdefault(key, value)
+
+    @staticmethod
+    def _mapping_key(mapping: dict):
+        return None if mapping is None else tuple(mapping.items())
+
+    def _filter_key(self, filters: Tuple[tuple, ...]) -> tuple:
+        return tuple(sorted(
+            ((column, self._mapping_key(mapping), tuple(values), bool(exclude and exclude[0]))
+             for column, mapping, values, *exclude in filters),
+            key=repr
+        ))
+
+    def mapped(self, column: str, mapping: dict = None, default=None, keep_unmapped: bool = False) -> pd.Series:
+        """
+        survey_data[column] mapped through mapping.
+
+        Unmapped values become default (NaN when None), or keep their original
+        value when keep_unmapped is set, like Series.replace.
+        """
+        def compute():
+            series = self.survey_data[column]
+            if mapping is None:
+                return series
+            result = series.map(mapping)
+            if keep_unmapped:
+                return result.where(series.isin(mapping.keys()), series)
+            if default is not None:
+                return result.fillna(default)
+            return result
+        return self.get(('mapped', column, self._mapping_key(mapping), default, keep_unmapped), compute)
+
+    def mask(self, column: str, mapping: dict, values, exclude: bool = False) -> np.ndarray:
+        """Boolean row mask of mapped(column, mapping) being in values (not in values with exclude)"""
+        values = tuple(values)
+        def compute():
+            mask = self.mapped(column, mapping).isin(values).to_numpy()
+            return ~mask if exclude else mask
+        return self.get(('mask', column, self._mapping_key(mapping), values, exclude), compute)
+
+    def _combined_mask(self, filters: Tuple[tuple, ...]) -> np.ndarray:
+        if not filters:
+            return None
+        return self.get(('masks',) + self._filter_key(filters), lambda: np.logical_and.reduce(
+            [self.mask(*spec) for spec in filters]
+        ))
+
+    def weighted_sum(self, *filters: tuple) -> float:
+        """Sum of weights over the rows matching every filter (all rows without filters)"""
+        def compute():
+            weights = self.survey_data[self.weight_column]
+            mask = self._combined_mask(filters)
+            return weights.sum() if mask is None else weights[mask].sum()
+        return self.get(('sum',) + self._filter_key(filters), compute)
+
+    def weighted_pivot(self, index: tuple, columns: tuple, filters: Tuple[tuple, ...] = ()) -> pd.DataFrame:
+        """
+        Weighted sum pivot of two dimensions, each a tuple of mapped() arguments
+        (column, mapping[, default[, keep_unmapped]]), over the rows matching filters.
+        Rows or columns with no answers are left out and empty cells are NaN,
+        as with pd.pivot_table.
+        """
+        def compute():
+            frame = pd.DataFrame({
+                'index': self.mapped(*index),
+                'columns': self.mapped(*columns),
+                'weight': self.survey_data[self.weight_column]
+            })
+            mask = self._combined_mask(filters)
+            if mask is not None:
+                frame = frame[mask]
+            return pd.pivot_table(frame, values='weight', index='index', columns='columns', aggfunc='sum')
+        key = ('pivot', self._dimension_key(index), self._dimension_key(columns), self._filter_key(filters))
+        return self.get(key, compute)
+
+    def _dimension_key(self, dimension: tuple) -> tuple:
+        column, mapping, *rest = dimension
+        return (column, self._mapping_key(mapping)) + tuple(rest)
@@ -0,0 +1,123 @@
+# utils/bootstrap.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+def _resample_counts(rng: np.random.Generator, n_rows: int, replicates: int) -> np.ndarray:
+    """(replicates, n_rows) matrix of how often each row is drawn in each bootstrap resample"""
+    draws = rng.integers(0, n_rows, size=(replicates, n_rows))
+    # Offset every replicate's draws into its own block so one bincount fills the whole matrix
+    draws += np.arange(replicates)[:, None] * n_rows
+    return np.bincount(draws.ravel(), minlength=replicates * n_rows).reshape(replicates, n_rows).astype(np.float64)
+
+def _replicate_shares(args: tuple) -> np.ndarray:
+    """
+    Shares of every cell in a block of bootstrap replicates.
+
+    numerators is the (n_rows, n_cells) matrix of each row's weight in the
+    cell it answers, denominators the (n_rows, n_bases) matrix of its weight in each base; every base
+    covers cells_per_base consecutive cells. Runs in worker processes as well.
+    """
+    numerators, denominators, cells_per_base, replicates, seed = args
+    counts = _resample_counts(np.random.default_rng(seed), numerators.shape[0], replicates)
+    bases = np.repeat(counts @ denominators, cells_per_base, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (counts @ numerators) / bases
+
+class WeightedBootstrap:
+    """
+    Vectorized weighted bootstrap for vote-share margins of error.
+
+    Respondents are resampled with replacement; each replicate is a row of
+    draw counts, so the weighted shares of all parties (and all subgroups)
+    in a block of replicates come out of two matrix products. Blocks are
+    sized to keep the count matrix under max_cells values and can be spread
+    over worker processes with max_workers.
+    """
+    def __init__(self, replicates: int = 2000, confidence: float = 0.95, seed: int = None,
+                 max_cells: int = 5_000_000, max_workers: int = None):
+        if replicates < 2:
+            raise Exception(f"Error configuring bootstrap: need at least 2 replicates, got {replicates}")
+        if not 0 < confidence < 1:
+            raise Exception(f"Error configuring bootstrap: confidence must be between 0 and 1, got {confidence}")
+        self.replicates = replicates
+        self.confidence = confidence
+        self.seed = seed
+        self.max_cells = max_cells
+        self.max_workers = max_workers
+
+    def _blocks(self, n_rows: int) -> List[Tuple[int, np.random.SeedSequence]]:
+        """Split the replicates into (size, seed) blocks; the result does not depend on max_workers"""
+        size = max(1, min(self.replicates, self.max_cells // max(n_rows, 1)))
+        sizes = [size] * (self.replicates // size)
+        if self.replicates % size:
+            sizes.append(self.replicates % size)
+        return list(zip(sizes, np.random.SeedSequence(self.seed).spawn(len(sizes))))
+
+    def replicate_shares(self, numerators: np.ndarray, denominators: np.ndarray, cells_per_base: int = 1) -> np.ndarray:
+        """(replicates, n_cells) matrix of bootstrap shares for the matrices described in _replicate_shares"""
+        tasks = [(numerators, denominators, cells_per_base, size, seed) for size, seed in self._blocks(numerators.shape[0])]
+        if self.max_workers and self.max_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                blocks = list(executor.map(_replicate_shares, tasks))
+        else:
+            blocks = [_replicate_shares(task) for task in tasks]
+        return np.vstack(blocks)
+
+    def share_intervals(self, categories: pd.Series, weights: pd.Series, groups: pd.Series = None) -> pd.DataFrame:
+        """
+        Weighted percentage of every category with its bootstrap confidence interval.
+
+        Without groups the shares are of the whole sample (rows with a missing
+        category still count in the base, like DataProcessor); with groups they
+        are within each group and rows without a group are left out. Returns
+        Share, Lower, Upper and Margin (half the interval width) in percent,
+        indexed by Category or by (Group, Category).
+        """
+        weights = pd.Series(weights, index=categories.index).astype(float)
+        valid = weights.notna().to_numpy().copy()
+        if groups is not None:
+            valid &= groups.notna().to_numpy()
+        weights = weights.to_numpy()[valid]
+        if len(weights) == 0:
+            raise Exception("Error computing bootstrap intervals: no rows with weights")
+
+        category_codes, category_labels = pd.factorize(categories[valid], sort=True)
+        if groups is None:
+            group_codes, group_labels = np.zeros(len(weights), dtype=np.int64), [None]
+        else:
+            group_codes, group_labels = pd.factorize(groups[valid], sort=True)
+
+        n_categories = len(category_labels)
+        n_cells = len(group_labels) * n_categories
+        rows = np.arange(len(weights))
+        answered = category_codes >= 0
+        cells = group_codes * n_categories + category_codes
+
+        numerators = np.zeros((len(weights), n_cells))
+        numerators[rows[answered], cells[answered]] = weights[answered]
+        denominators = np.zeros((len(weights), len(group_labels)))
+        denominators[rows, group_codes] = weights
+
+        # Every category of a group shares the group's base
+        with np.errstate(divide='ignore', invalid='ignore'):
+            point = numerators.sum(axis=0) / np.repeat(denominators.sum(axis=0), n_categories)
+        shares = self.replicate_shares(numerators, denominators, n_categories)
+        alpha = (1 - self.confidence) / 2
+        lower, upper = np.nanquantile(shares, [alpha, 1 - alpha], axis=0)
+
+        if groups is None:
+            index = pd.Index(category_labels, name='Category')
+        else:
+            index = pd.MultiIndex.from_product([group_labels, category_labels], names=['Group', 'Category'])
+        return pd.DataFrame({
+            'Share': point * 100,
+            'Lower': lower * 100,
+            'Upper': upper * 100,
+            'Margin': (upper - lower) * 50
+        }, index=index).round(1)
+
+    def subgroup_intervals(self, categories: pd.Series, weights: pd.Series, subgroups: Dict[str, pd.Series]) -> Dict[str, pd.DataFrame]:
+        """share_intervals for every {name: group column}, e.g. party shares by age group and education"""
+        return {name: self.share_intervals(categories, weights, groups) for name, groups in subgroups.items()}
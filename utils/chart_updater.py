@@ -5,12 +5,24 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List
 from config.constants import PARTY_PAIRS, PARTY_2023_SLIDE
+from utils.data_processor import DataProcessor
+from utils.file_handler import open_buffer
 
 class ChartUpdater:
-    def __init__(self, output_path: str, language: str = 'tr'):
+    def __init__(self, output_path, language: str = 'tr', chart_index: Dict[str, List[int]] = None, template=None,
+                 window: int = None, windows: Dict[str, int] = None):
+        # output_path may be a path or a writable buffer; the deck is read from
+        # template (path, bytes or buffer) when given, otherwise from output_path
         self.output_path = output_path
+        self.template = template
         self.language = language
         self.prs = None
+        # Chart name -> slide indexes; built on first lookup unless supplied for this template
+        self.chart_index = chart_index
+        # Months shown by the time-series charts: window for every historical
+        # sheet, overridden per sheet by windows; None shows the full history
+        self.window = window
+        self.windows = windows or {}
         
         # Complete translation mappings for both Turkish and English
         self.translations = {
@@ -193,7 +205,33 @@ class ChartUpdater:
     def _load_presentation(self):
         """Load presentation if not already loaded"""
         if self.prs is None:
-            self.prs = Presentation(self.output_path)
+            source = self.template if self.template is not None else self.output_path
+            self.prs = Presentation(open_buffer(source))
+
+    @staticmethod
+    def build_chart_index(prs) -> Dict[str, List[int]]:
+        """Map each chart shape name to the indexes of the slides that contain it"""
+        index = {}
+        for slide_idx, slide in enumerate(prs.slides):
+            for shape in slide.shapes:
+                if shape.has_chart:
+                    slides = index.setdefault(shape.name, [])
+                    if slide_idx not in slides:
+                        slides.append(slide_idx)
+        return index
+
+    def _find_charts(self, name: str) -> list:
+        """Return the first chart named `name` on each slide that has one, in slide order"""
+        if self.chart_index is None:
+            self.chart_index = self.build_chart_index(self.prs)
+        
+        charts = []
+        for slide_idx in self.chart_index.get(name, []):
+            slide = self.prs.slides[slide_idx]
+            chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == name), None)
+            if chart:
+                charts.append(chart)
+        return charts
 
     def _save_presentation(self):
         """Save presentation and close it"""
@@ -217,6 +255,13 @@ class ChartUpdater:
         if chart.value_axis is not None:
             chart.value_axis.tick_labels.number_format = number_format
 
+    def _apply_window(self, sheet_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Last months of a historical sheet according to the configured windows"""
+        window = self.windows.get(sheet_name, self.window)
+        if not window or not isinstance(df, pd.DataFrame) or 'Months' not in df.columns:
+            return df
+        return df.tail(window)
+
     def update_all_charts(self, party_data: Dict[str, float], historical_data: Dict[str, pd.DataFrame]):
         """Update all charts in one go to avoid multiple file operations"""
         print(f"\nUpdating charts for language: {self.language}")
@@ -224,6 +269,12 @@ class ChartUpdater:
         
         self._load_presentation()
         
+        # Trim every series to its display window before any chart data is built;
+        # the full history stays in the historical workbook
+        historical_data = {
+            sheet_name: self._apply_window(sheet_name, df) for sheet_name, df in historical_data.items()
+        }
+        
         try:
             # Update main party chart
             self._update_party_chart(15, party_data)
@@ -257,7 +308,9 @@ class ChartUpdater:
             
             # Verify the file exists and has size
             import os
-            if os.path.exists(self.output_path):
+            if hasattr(self.output_path, 'getbuffer'):
+                print(f"Presentation saved in memory. Size: {self.output_path.getbuffer().nbytes} bytes")
+            elif os.path.exists(self.output_path):
                 print(f"File saved successfully. Size: {os.path.getsize(self.output_path)} bytes")
             else:
                 print("WARNING: File not found after saving!")
@@ -349,24 +402,21 @@ class ChartUpdater:
             
             # Find the chart by name
             chart_name = f'education_{sheet_name.split("_")[-1]}'
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == chart_name), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    
-                    # Use dates from Months column with translation
-                    data = df
-                    chart_data.categories = self._translate_list(data['Months'].tolist(), 'dates')
-                    
-                    # Add each education level as a series with translations
-                    for level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
-                        values = data[level].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(level, 'education'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
-                    break
+            for chart in self._find_charts(chart_name)[:1]:
+                chart_data = CategoryChartData()
+                
+                # Use dates from Months column with translation
+                data = df
+                chart_data.categories = self._translate_list(data['Months'].tolist(), 'dates')
+                
+                # Add each education level as a series with translations
+                for level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
+                    values = data[level].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(level, 'education'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
 
     def _update_age_charts(self, historical_data: Dict[str, pd.DataFrame]):
         """Update age breakdown time series charts"""
@@ -388,34 +438,27 @@ class ChartUpdater:
             
             # Find the chart by name
             chart_name = f'age_{sheet_name.split("_")[-1]}'
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == chart_name), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    
-                    # Use dates from Months column with translation
-                    data = df
-                    chart_data.categories = self._translate_list(data['Months'].tolist(), 'dates')
-                    
-                    # Add each age group as a series with translations
-                    for group in ['18-34', '35-54', '55 ve üstü']:
-                        values = data[group].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(group, 'age'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
-                    break
+            for chart in self._find_charts(chart_name)[:1]:
+                chart_data = CategoryChartData()
+                
+                # Use dates from Months column with translation
+                data = df
+                chart_data.categories = self._translate_list(data['Months'].tolist(), 'dates')
+                
+                # Add each age group as a series with translations
+                for group in ['18-34', '35-54', '55 ve üstü']:
+                    values = data[group].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(group, 'age'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
 
     def _update_2023_party_chart(self, retention_df: pd.DataFrame):
         """Update 2023 party retention time series chart"""
         # Find the chart by name
-        chart = None
-        for slide in self.prs.slides:
-            chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == '2023_party'), None)
-            if chart:
-                break
-        
+        chart = next(iter(self._find_charts('2023_party')), None)
+
         if chart:
             chart_data = CategoryChartData()
             
@@ -439,121 +482,107 @@ class ChartUpdater:
         # Update main economic situation chart (Slide 32)
         if 'econ_main' in historical_data:
             df = historical_data['econ_main']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_main'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for response in ['Çok kötü / Kötü', 'Ne iyi ne kötü', 'Çok İyi / İyi']:
-                        values = df[response].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(response, 'economy'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_main'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for response in ['Çok kötü / Kötü', 'Ne iyi ne kötü', 'Çok İyi / İyi']:
+                    values = df[response].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(response, 'economy'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update economic negative by party chart (Slide 33)
         if 'econ_negative_party' in historical_data:
             df = historical_data['econ_negative_party']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_negative_party'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-                        values = df[party].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(party, 'parties'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_negative_party'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
+                    values = df[party].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(party, 'parties'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update economic negative by age chart (Slide 35)
         if 'econ_negative_age' in historical_data:
             df = historical_data['econ_negative_age']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_negative_age'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for age_group in ['18-34', '35-54', '55 ve üstü']:
-                        values = df[age_group].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(age_group, 'age'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_negative_age'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for age_group in ['18-34', '35-54', '55 ve üstü']:
+                    values = df[age_group].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(age_group, 'age'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update economic negative by education chart (Slide 37)
         if 'econ_negative_education' in historical_data:
             df = historical_data['econ_negative_education']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_negative_education'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for edu_level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
-                        values = df[edu_level].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(edu_level, 'education'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_negative_education'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for edu_level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
+                    values = df[edu_level].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(edu_level, 'education'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
 
         # Update main future economic situation chart (Slide 40)
         if 'econ_future_main' in historical_data:
             df = historical_data['econ_future_main']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_future_main'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for response in ['Çok Daha Kötü/Daha Kötü', 'Değişmez', 'Çok Daha İyi/Daha İyi']:
-                        values = df[response].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(response, 'economy'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_future_main'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for response in ['Çok Daha Kötü/Daha Kötü', 'Değişmez', 'Çok Daha İyi/Daha İyi']:
+                    values = df[response].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(response, 'economy'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update future economic negative by party chart (Slide 41)
         if 'econ_future_party' in historical_data:
             df = historical_data['econ_future_party']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_future_party'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-                        values = df[party].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(party, 'parties'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_future_party'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
+                    values = df[party].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(party, 'parties'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update future economic negative by age chart (Slide 43)
         if 'econ_future_age' in historical_data:
             df = historical_data['econ_future_age']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'econ_future_age'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for age_group in ['18-34', '35-54', '55 ve üstü']:
-                        values = df[age_group].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(age_group, 'age'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('econ_future_age'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for age_group in ['18-34', '35-54', '55 ve üstü']:
+                    values = df[age_group].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(age_group, 'age'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
 
     def _update_politician_success_charts(self, historical_data: Dict[str, pd.DataFrame], current_success_data: pd.DataFrame):
         """Update all politician success charts"""
@@ -563,30 +592,27 @@ class ChartUpdater:
         # Update current month's success rates (Slide 29)
         print("\nLooking for 'politician_success' chart...")
         chart_found = False
-        for slide_num, slide in enumerate(self.prs.slides, 1):
-            chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'politician_success'), None)
-            if chart:
-                print(f"Found 'politician_success' chart in slide {slide_num}")
-                chart_found = True
-                chart_data = CategoryChartData()
-                # Create a copy of the DataFrame to avoid modifying the original
-                current_data = current_success_data.copy()
-                print(f"Original politician names: {current_data['Politician'].tolist()}")
-                # Translate politician names
-                current_data['Politician'] = current_data['Politician'].apply(lambda x: self._translate(x, 'politicians'))
-                # Sort by Success Rate in descending order
-                current_data = current_data.sort_values('Success Rate', ascending=False)
-                print(f"Translated and sorted politician names: {current_data['Politician'].tolist()}")
-                chart_data.categories = current_data['Politician'].tolist()
-                chart_data.add_series(self._translate('Success Rate', 'chart_titles'), current_data['Success Rate'].tolist())
-                try:
-                    print("Attempting to replace chart data...")
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
-                    print("Successfully replaced chart data")
-                except Exception as e:
-                    print(f"Error replacing chart data: {str(e)}")
-                break
+        for chart in self._find_charts('politician_success')[:1]:
+            print("Found 'politician_success' chart")
+            chart_found = True
+            chart_data = CategoryChartData()
+            # Create a copy of the DataFrame to avoid modifying the original
+            current_data = current_success_data.copy()
+            print(f"Original politician names: {current_data['Politician'].tolist()}")
+            # Translate politician names
+            current_data['Politician'] = current_data['Politician'].apply(lambda x: self._translate(x, 'politicians'))
+            # Sort by Success Rate in descending order
+            current_data = current_data.sort_values('Success Rate', ascending=False)
+            print(f"Translated and sorted politician names: {current_data['Politician'].tolist()}")
+            chart_data.categories = current_data['Politician'].tolist()
+            chart_data.add_series(self._translate('Success Rate', 'chart_titles'), current_data['Success Rate'].tolist())
+            try:
+                print("Attempting to replace chart data...")
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
+                print("Successfully replaced chart data")
+            except Exception as e:
+                print(f"Error replacing chart data: {str(e)}")
         
         if not chart_found:
             print("WARNING: 'politician_success' chart not found!")
@@ -597,37 +623,34 @@ class ChartUpdater:
             df = historical_data['politician_success_main']
             print(f"Available columns in main data: {df.columns.tolist()}")
             chart_found = False
-            for slide_num, slide in enumerate(self.prs.slides, 1):
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'politician_success_main'), None)
-                if chart:
-                    print(f"Found 'politician_success_main' chart in slide {slide_num}")
-                    chart_found = True
-                    chart_data = CategoryChartData()
-                    dates = self._translate_list(df['Months'].tolist(), 'dates')
-                    print(f"Translated dates: {dates}")
-                    chart_data.categories = dates
-                    
-                    for politician in ['Recep Tayyip Erdoğan', 'Özgür Özel', 'Devlet Bahçeli', 
-                                     'Ekrem İmamoğlu', 'Mansur Yavaş', 'Fatih Erbakan']:
-                        if politician in df.columns:
-                            print(f"Processing politician: {politician}")
-                            values = df[politician].tolist()
-                            # Convert zeros to None instead of 0
-                            values = [None if pd.isna(x) or not np.isfinite(x) or x == 0 else float(x) for x in values]
-                            translated_name = self._translate(politician, 'politicians')
-                            print(f"Translated name: {translated_name}")
-                            chart_data.add_series(translated_name, values)
-                        else:
-                            print(f"WARNING: Politician {politician} not found in data!")
-                    
-                    try:
-                        print("Attempting to replace chart data...")
-                        chart.replace_data(chart_data)
-                        self._apply_chart_number_format(chart, '0.0')
-                        print("Successfully replaced chart data")
-                    except Exception as e:
-                        print(f"Error replacing chart data: {str(e)}")
-                    break
+            for chart in self._find_charts('politician_success_main')[:1]:
+                print("Found 'politician_success_main' chart")
+                chart_found = True
+                chart_data = CategoryChartData()
+                dates = self._translate_list(df['Months'].tolist(), 'dates')
+                print(f"Translated dates: {dates}")
+                chart_data.categories = dates
+                
+                for politician in ['Recep Tayyip Erdoğan', 'Özgür Özel', 'Devlet Bahçeli', 
+                                 'Ekrem İmamoğlu', 'Mansur Yavaş', 'Fatih Erbakan']:
+                    if politician in df.columns:
+                        print(f"Processing politician: {politician}")
+                        values = df[politician].tolist()
+                        # Convert zeros to None instead of 0
+                        values = [None if pd.isna(x) or not np.isfinite(x) or x == 0 else float(x) for x in values]
+                        translated_name = self._translate(politician, 'politicians')
+                        print(f"Translated name: {translated_name}")
+                        chart_data.add_series(translated_name, values)
+                    else:
+                        print(f"WARNING: Politician {politician} not found in data!")
+                
+                try:
+                    print("Attempting to replace chart data...")
+                    chart.replace_data(chart_data)
+                    self._apply_chart_number_format(chart, '0.0')
+                    print("Successfully replaced chart data")
+                except Exception as e:
+                    print(f"Error replacing chart data: {str(e)}")
             
             if not chart_found:
                 print("WARNING: 'politician_success_main' chart not found!")
@@ -640,37 +663,34 @@ class ChartUpdater:
             df = historical_data['politician_success_second']
             print(f"Available columns in secondary data: {df.columns.tolist()}")
             chart_found = False
-            for slide_num, slide in enumerate(self.prs.slides, 1):
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'politician_success_second'), None)
-                if chart:
-                    print(f"Found 'politician_success_second' chart in slide {slide_num}")
-                    chart_found = True
-                    chart_data = CategoryChartData()
-                    dates = self._translate_list(df['Months'].tolist(), 'dates')
-                    print(f"Translated dates: {dates}")
-                    chart_data.categories = dates
-                    
-                    for politician in ['Muharrem İnce', 'Erkan Baş', 'Ümit Özdağ', 'Müsavat Dervişoğlu',
-                                     'Tülay Hatimoğulları Oruç', 'Yavuz Ağıralioğlu', 'Mahmut Arıkan']:
-                        if politician in df.columns:
-                            print(f"Processing politician: {politician}")
-                            values = df[politician].tolist()
-                            # Convert zeros to None instead of 0
-                            values = [None if pd.isna(x) or not np.isfinite(x) or x == 0 else float(x) for x in values]
-                            translated_name = self._translate(politician, 'politicians')
-                            print(f"Translated name: {translated_name}")
-                            chart_data.add_series(translated_name, values)
-                        else:
-                            print(f"WARNING: Politician {politician} not found in data!")
-                    
-                    try:
-                        print("Attempting to replace chart data...")
-                        chart.replace_data(chart_data)
-                        self._apply_chart_number_format(chart, '0.0')
-                        print("Successfully replaced chart data")
-                    except Exception as e:
-                        print(f"Error replacing chart data: {str(e)}")
-                    break
+            for chart in self._find_charts('politician_success_second')[:1]:
+                print("Found 'politician_success_second' chart")
+                chart_found = True
+                chart_data = CategoryChartData()
+                dates = self._translate_list(df['Months'].tolist(), 'dates')
+                print(f"Translated dates: {dates}")
+                chart_data.categories = dates
+                
+                for politician in ['Muharrem İnce', 'Erkan Baş', 'Ümit Özdağ', 'Müsavat Dervişoğlu',
+                                 'Tülay Hatimoğulları Oruç', 'Yavuz Ağıralioğlu', 'Mahmut Arıkan']:
+                    if politician in df.columns:
+                        print(f"Processing politician: {politician}")
+                        values = df[politician].tolist()
+                        # Convert zeros to None instead of 0
+                        values = [None if pd.isna(x) or not np.isfinite(x) or x == 0 else float(x) for x in values]
+                        translated_name = self._translate(politician, 'politicians')
+                        print(f"Translated name: {translated_name}")
+                        chart_data.add_series(translated_name, values)
+                    else:
+                        print(f"WARNING: Politician {politician} not found in data!")
+                
+                try:
+                    print("Attempting to replace chart data...")
+                    chart.replace_data(chart_data)
+                    self._apply_chart_number_format(chart, '0.0')
+                    print("Successfully replaced chart data")
+                except Exception as e:
+                    print(f"Error replacing chart data: {str(e)}")
             
             if not chart_found:
                 print("WARNING: 'politician_success_second' chart not found!")
@@ -682,49 +702,40 @@ class ChartUpdater:
         # Update main subsistence chart (Slide 49)
         if 'subsistence' in historical_data:
             df = historical_data['subsistence']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'subsistence'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    responses = [
-                        'Gelirim giderimi karşılamadı.',
-                        'Gelirim giderimi ucu ucuna karşıladı.',
-                        'Gelirim giderlerimin üzerinde oldu.',
-                        'Gelirim giderlerimi fazlasıyla karşıladı.'
-                    ]
-                    
-                    for response in responses:
-                        values = df[response].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(response, 'subsistence'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('subsistence'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                responses = [
+                    'Gelirim giderimi karşılamadı.',
+                    'Gelirim giderimi ucu ucuna karşıladı.',
+                    'Gelirim giderlerimin üzerinde oldu.',
+                    'Gelirim giderlerimi fazlasıyla karşıladı.'
+                ]
+                
+                for response in responses:
+                    values = df[response].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(response, 'subsistence'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
         
         # Update subsistence by party chart (Slide 51)
         if 'subsistence_party' in historical_data:
             df = historical_data['subsistence_party']
-            for slide in self.prs.slides:
-                chart = next((shape.chart for shape in slide.shapes if shape.has_chart and shape.name == 'subsistence_party'), None)
-                if chart:
-                    chart_data = CategoryChartData()
-                    chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
-                    
-                    for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-                        values = df[party].tolist()
-                        values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
-                        chart_data.add_series(self._translate(party, 'parties'), values)
-                    
-                    chart.replace_data(chart_data)
-                    self._apply_chart_number_format(chart, '0.0')
+            for chart in self._find_charts('subsistence_party'):
+                chart_data = CategoryChartData()
+                chart_data.categories = self._translate_list(df['Months'].tolist(), 'dates')
+                
+                for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
+                    values = df[party].tolist()
+                    values = [float(0) if pd.isna(x) or not np.isfinite(x) else float(x) for x in values]
+                    chart_data.add_series(self._translate(party, 'parties'), values)
+                
+                chart.replace_data(chart_data)
+                self._apply_chart_number_format(chart, '0.0')
 
     def _prepare_sorted_data(self, party_data: pd.DataFrame) -> pd.DataFrame:
         """Prepare sorted data with 'Diğer' always at the bottom"""
-        diger_data = party_data[party_data['Party'] == 'Diğer']
-        other_parties = party_data[party_data['Party'] != 'Diğer']
-        sorted_parties = other_parties.sort_values('Percentage', ascending=False)
-        if not diger_data.empty:
-            sorted_parties = pd.concat([sorted_parties, diger_data])
-        return sorted_parties
+        return DataProcessor.prepare_sorted_data(party_data)
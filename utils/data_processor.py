@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import Dict
 from config.constants import PARTY_MAPPING  # Changed to absolute import
@@ -5,28 +6,52 @@ from config.constants import PARTY_MAPPING  # Changed to absolute import
 class DataProcessor:
     @staticmethod
     def process_survey_data(df: pd.DataFrame, question_column: str, weight_column: str = 'duzeltilmis_agirlik') -> Dict[str, float]:
-        """Process survey data and calculate weighted percentages"""
-        # Map party names
-        df['Party'] = df[question_column].map(
-            lambda x: PARTY_MAPPING.get(x, 'Diğer')
-        )
+        """
+        Calculate weighted party percentages without modifying df.
+
+        Answers are encoded once and only the distinct answers are mapped to
+        parties (unknown or missing ones to 'Diğer'), so the work per row is a
+        single bincount. Returns {party: percentage rounded to one decimal},
+        ordered for charting: largest first, 'Diğer' last.
+        """
+        codes, answers = pd.factorize(df[question_column], use_na_sentinel=False)
+        parties = pd.Index([PARTY_MAPPING.get(answer, 'Diğer') for answer in answers], dtype=object)
+        party_codes, party_names = pd.factorize(parties)
         
-        # Calculate weighted percentages
-        total_weight = df[weight_column].sum()
-        party_results = df.groupby('Party')[weight_column].sum().reset_index()
-        party_results['Percentage'] = (party_results[weight_column] / total_weight) * 100
+        # Missing weights count as zero, as in a groupby sum
+        weights = df[weight_column].to_numpy(dtype=float, na_value=np.nan)
+        weights = np.where(np.isnan(weights), 0.0, weights)
+        party_weights = np.bincount(party_codes[codes], weights=weights, minlength=len(party_names))
         
-        # Round percentages to one decimal place
-        party_results['Percentage'] = party_results['Percentage'].round(1)
+        # Calculate weighted percentages rounded to one decimal place
+        percentages = np.round(party_weights / weights.sum() * 100, 1)
+        party_results = pd.DataFrame({'Party': party_names, 'Percentage': percentages})
+        party_results = DataProcessor.prepare_sorted_data(party_results.sort_values('Party'))
         
-        return {row['Party']: row['Percentage'] for _, row in party_results.iterrows()}
+        return dict(zip(party_results['Party'].tolist(), party_results['Percentage'].tolist()))
+
+    @staticmethod
+    def party_share_intervals(df: pd.DataFrame, question_column: str, weight_column: str = 'duzeltilmis_agirlik',
+                              bootstrap=None, subgroups: Dict[str, str] = None):
+        """
+        Bootstrap confidence intervals of the party percentages from process_survey_data.
+
+        Returns the interval frame for the whole sample, or {name: frame} of
+        shares within each group when subgroups maps names to group columns.
+        """
+        from utils.bootstrap import WeightedBootstrap
+
+        bootstrap = bootstrap or WeightedBootstrap()
+        parties = df[question_column].map(lambda x: PARTY_MAPPING.get(x, 'Diğer'))
+        if subgroups:
+            return bootstrap.subgroup_intervals(
+                parties, df[weight_column], {name: df[column] for name, column in subgroups.items()}
+            )
+        return bootstrap.share_intervals(parties, df[weight_column])
 
     @staticmethod
     def prepare_sorted_data(party_data: pd.DataFrame) -> pd.DataFrame:
         """Prepare sorted data with 'Diğer' always at the bottom"""
-        diger_data = party_data[party_data['Party'] == 'Diğer']
-        other_parties = party_data[party_data['Party'] != 'Diğer']
-        sorted_parties = other_parties.sort_values('Percentage', ascending=False)
-        if not diger_data.empty:
-            sorted_parties = pd.concat([sorted_parties, diger_data])
-        return sorted_parties
+        # One stable sort: by 'Diğer' last, then by percentage descending; ties keep their order
+        order = np.lexsort((-party_data['Percentage'].to_numpy(), (party_data['Party'] == 'Diğer').to_numpy()))
+        return party_data.iloc[order]
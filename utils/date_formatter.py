@@ -26,4 +26,15 @@ class TurkishDateFormatter:
         month_tr = cls.MONTH_MAP[date.month]
         year = str(date.year)[2:]  # Get last 2 digits of year
         
-        return f"{month_tr}.{year}"
\ No newline at end of file
+        return f"{month_tr}.{year}"
+
+    @classmethod
+    def parse_date(cls, label: str) -> datetime:
+        """Parse a Turkish MMM.YY label back into the first day of its month; None if it is not one"""
+        if not isinstance(label, str) or '.' not in label:
+            return None
+        month_tr, year = label.strip().rsplit('.', 1)
+        months = {name: number for number, name in cls.MONTH_MAP.items()}
+        if month_tr not in months or not year.isdigit() or len(year) != 2:
+            return None
+        return datetime(2000 + int(year), months[month_tr], 1)
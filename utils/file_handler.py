@@ -1,21 +1,89 @@
+import io
 import os
+import shutil
 from datetime import datetime
-import streamlit as st
 import tempfile
-from openpyxl import load_workbook
+
+def open_buffer(source):
+    """
+    Return something pandas, openpyxl and python-pptx can read from, without copying.
+
+    Paths are returned unchanged. bytes, a memoryview over bytes or an object
+    with getvalue() (BytesIO, Streamlit UploadedFile) become a fresh BytesIO
+    sharing the original bytes, so every reader gets its own position and
+    concurrent readers never interfere.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if hasattr(source, 'getvalue'):
+        source = source.getvalue()
+    if isinstance(source, memoryview):
+        # A view over a whole bytes object can hand back that object; anything else needs a copy
+        if isinstance(source.obj, bytes) and source.nbytes == len(source.obj):
+            source = source.obj
+        else:
+            source = source.tobytes()
+    return io.BytesIO(source)
+
+# umask of the process, read once at import (it can only be read by setting it);
+# staged files get the permissions a plain open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def staged_path(destination: str) -> str:
+    """Create an empty temporary file next to destination, to be moved over it by commit_staged"""
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(destination)), suffix=os.path.splitext(destination)[1]
+    )
+    os.close(descriptor)
+    return temp_path
+
+def commit_staged(temp_path: str, destination: str):
+    """
+    Atomically move a staged file over destination. The file keeps the
+    permissions of the file it replaces, or the umask default for a new one,
+    instead of mkstemp's owner-only mode.
+    """
+    if os.path.exists(destination):
+        shutil.copymode(destination, temp_path)
+    else:
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+    os.replace(temp_path, destination)
+
+def write_atomic(destination: str, data: bytes):
+    """Write data to a staged file and commit it over destination; a failure leaves destination untouched"""
+    temp_path = staged_path(destination)
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        commit_staged(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Namespaces and content types of the .xlsx parts checked by verify_excel_file
+CONTENT_TYPES_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+PACKAGE_RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+WORKBOOK_CONTENT_TYPES = {
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml',
+    'application/vnd.ms-excel.sheet.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml'
+}
 
 class FileHandler:
     def __init__(self):
         pass
         
-    def save_uploaded_file(self, uploaded_file) -> str:
-        """Save uploaded file to temp directory and return the path"""
+    def save_uploaded_file(self, uploaded_file, directory: str = None) -> str:
+        """Save uploaded file to directory (temp directory by default) and return the path"""
         import tempfile
         import os
-        from openpyxl import load_workbook
         
         # Create temp file with same extension
-        temp_dir = tempfile.gettempdir()
+        temp_dir = directory or tempfile.gettempdir()
         file_extension = os.path.splitext(uploaded_file.name)[1]
         temp_path = os.path.join(temp_dir, f'temp_{uploaded_file.name}')
         
@@ -29,12 +97,7 @@ class FileHandler:
             
             # Verify the file if it's an Excel file
             if file_extension.lower() == '.xlsx':
-                print("Verifying Excel file...")
-                try:
-                    wb = load_workbook(temp_path)
-                    print(f"Excel file verified. Available sheets: {wb.sheetnames}")
-                except Exception as e:
-                    raise Exception(f"Failed to verify Excel file: {str(e)}")
+                self.verify_excel_file(temp_path)
             
             return temp_path
         except Exception as e:
@@ -47,16 +110,81 @@ class FileHandler:
                     pass
             raise
     
-    def create_processed_file(self, template_file) -> tuple:
+    def verify_excel_file(self, source) -> list:
+        """
+        Check that a path or in-memory upload is a well-formed .xlsx and return its sheet names.
+
+        Only the zip central directory, [Content_Types].xml and the workbook's
+        sheet manifest are read (streamed), so this costs a few milliseconds
+        instead of a full openpyxl parse whose result would be thrown away.
+        """
+        import posixpath
+        import zipfile
+        import xml.etree.ElementTree as ET
+        
+        print("Verifying Excel file...")
+        try:
+            with zipfile.ZipFile(open_buffer(source)) as archive:
+                parts = set(archive.namelist())
+                if '[Content_Types].xml' not in parts:
+                    raise Exception("[Content_Types].xml is missing")
+                with archive.open('[Content_Types].xml') as f:
+                    content_types = {
+                        elem.get('PartName'): elem.get('ContentType')
+                        for _, elem in ET.iterparse(f) if elem.tag == f'{{{CONTENT_TYPES_NS}}}Override'
+                    }
+                
+                workbook_parts = [name.lstrip('/') for name, content_type in content_types.items()
+                                  if content_type in WORKBOOK_CONTENT_TYPES]
+                if not workbook_parts:
+                    raise Exception("no workbook part declared in [Content_Types].xml")
+                workbook_part = workbook_parts[0]
+                if workbook_part not in parts:
+                    raise Exception(f"{workbook_part} is missing")
+                
+                # Relationship id -> target of every part the workbook references
+                folder, filename = posixpath.split(workbook_part)
+                rels_part = posixpath.join(folder, '_rels', f'{filename}.rels')
+                targets = {}
+                if rels_part in parts:
+                    with archive.open(rels_part) as f:
+                        for _, elem in ET.iterparse(f):
+                            if elem.tag == f'{{{PACKAGE_RELATIONSHIPS_NS}}}Relationship':
+                                target = elem.get('Target', '')
+                                if target.startswith('/'):
+                                    target = target.lstrip('/')
+                                else:
+                                    target = posixpath.normpath(posixpath.join(folder, target))
+                                targets[elem.get('Id')] = target
+                
+                sheet_names = []
+                with archive.open(workbook_part) as f:
+                    for _, elem in ET.iterparse(f):
+                        if elem.tag != f'{{{SPREADSHEET_NS}}}sheet':
+                            continue
+                        name = elem.get('name')
+                        target = targets.get(elem.get(f'{{{OFFICE_RELATIONSHIPS_NS}}}id'))
+                        if target is None or target not in parts:
+                            raise Exception(f"sheet '{name}' has no matching part")
+                        sheet_names.append(name)
+                if not sheet_names:
+                    raise Exception("workbook has no sheets")
+            
+            print(f"Excel file verified. Available sheets: {sheet_names}")
+            return sheet_names
+        except Exception as e:
+            raise Exception(f"Failed to verify Excel file: {str(e)}")
+    
+    def create_processed_file(self, template_file, directory: str = None) -> tuple:
         """Create new files for processing and return paths for both Turkish and English versions"""
         import os
         import tempfile
         
         # Get template path
-        template_path = self.save_uploaded_file(template_file)
+        template_path = self.save_uploaded_file(template_file, directory)
         
         # Create output paths for both versions
-        temp_dir = tempfile.gettempdir()
+        temp_dir = directory or tempfile.gettempdir()
         name_without_ext, ext = os.path.splitext(template_file.name)
         
         tr_output_filename = f'{name_without_ext}{ext}'
@@ -81,8 +209,11 @@ class FileHandler:
         
         return template_path, tr_output_path, en_output_path
     
-    def get_download_button(self, file_path: str, button_text: str = "Download Processed File"):
-        """Create a download button for the processed file"""
+    def get_download_button(self, file_path: str, button_text: str = "Download Processed File", data: bytes = None):
+        """Create a download button for the processed file (or for in-memory data named after file_path)"""
+        # Imported here so that headless (CLI) runs never load Streamlit
+        import streamlit as st
+        
         try:
             print(f"Creating download button for file: {file_path}")
             
@@ -104,13 +235,15 @@ class FileHandler:
                 name_without_ext, ext = os.path.splitext(original_name)
                 original_name = f"{name_without_ext}_{month_suffix}{ext}"
             
-            with open(file_path, 'rb') as file:
-                st.download_button(
-                    label=button_text,
-                    data=file,
-                    file_name=original_name,
-                    mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                )
+            if data is None:
+                with open(file_path, 'rb') as file:
+                    data = file.read()
+            st.download_button(
+                label=button_text,
+                data=data,
+                file_name=original_name,
+                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+            )
             print("Successfully created download button")
         except Exception as e:
             print(f"Error creating download button: {str(e)}")
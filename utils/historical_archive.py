@@ -0,0 +1,140 @@
+# utils/historical_archive.py
+import io
+import os
+from datetime import datetime
+from typing import Dict, Tuple
+from utils.date_formatter import TurkishDateFormatter
+from utils.file_handler import write_atomic
+
+def _month_index(date: datetime) -> int:
+    return date.year * 12 + date.month - 1
+
+def latest_month(sheets: Dict[str, 'pd.DataFrame']) -> datetime:
+    """Latest month labelled in the Months column of any sheet; None when there is none"""
+    months = [
+        TurkishDateFormatter.parse_date(label)
+        for df in sheets.values() if 'Months' in df.columns
+        for label in df['Months']
+    ]
+    months = [month for month in months if month is not None]
+    return max(months) if months else None
+
+def split_hot_cold(sheets: Dict[str, 'pd.DataFrame'], horizon_months: int,
+                   reference: datetime = None) -> Tuple[Dict[str, 'pd.DataFrame'], Dict[str, 'pd.DataFrame']]:
+    """
+    Split every sheet into (hot, cold) rows around a horizon.
+
+    Rows more than horizon_months before reference (the latest month of the
+    workbook by default) are cold; everything else, including sheets without
+    a Months column (current_success) and rows whose label is not a month,
+    stays hot. Sheets without cold rows are left out of the cold dict.
+    """
+    if horizon_months < 1:
+        raise Exception(f"Error splitting historical data: horizon must be at least one month, got {horizon_months}")
+    reference = reference or latest_month(sheets)
+    hot, cold = {}, {}
+    for sheet_name, df in sheets.items():
+        if reference is None or 'Months' not in df.columns:
+            hot[sheet_name] = df
+            continue
+        ages = df['Months'].map(TurkishDateFormatter.parse_date).map(
+            lambda month: _month_index(reference) - _month_index(month) if month is not None else -1
+        )
+        is_cold = (ages >= horizon_months).to_numpy()
+        hot[sheet_name] = df[~is_cold].reset_index(drop=True)
+        if is_cold.any():
+            cold[sheet_name] = df[is_cold].reset_index(drop=True)
+    return hot, cold
+
+def merge_hot_cold(hot: Dict[str, 'pd.DataFrame'], cold: Dict[str, 'pd.DataFrame']) -> Dict[str, 'pd.DataFrame']:
+    """
+    Full series of every sheet: archived rows followed by the working rows.
+
+    A month present in both (e.g. after an interrupted compaction) is taken
+    from the working workbook. Sheet order follows the working workbook.
+    """
+    import pandas as pd
+
+    merged = {}
+    for sheet_name in list(hot) + [name for name in cold if name not in hot]:
+        working = hot.get(sheet_name)
+        archived = cold.get(sheet_name)
+        if archived is None or archived.empty or 'Months' not in archived.columns:
+            merged[sheet_name] = working if working is not None else archived
+            continue
+        if working is None:
+            merged[sheet_name] = archived
+            continue
+        archived = archived[~archived['Months'].isin(working['Months'])]
+        merged[sheet_name] = pd.concat([archived, working], ignore_index=True)
+    return merged
+
+def read_sheets(path: str) -> Dict[str, 'pd.DataFrame']:
+    """Every sheet of a workbook; an empty dict when the file does not exist"""
+    import pandas as pd
+
+    if not os.path.exists(path):
+        return {}
+    try:
+        return pd.read_excel(path, sheet_name=None)
+    except Exception as e:
+        raise Exception(f"Error reading {path}: {str(e)}")
+
+def write_sheets(path: str, sheets: Dict[str, 'pd.DataFrame'], compression: str = None):
+    """
+    Write sheets as a workbook to path atomically: the workbook is built in
+    memory, optionally repacked with a compression policy and committed with
+    file_handler.write_atomic, keeping the permissions of the file it replaces.
+    """
+    import numpy as np
+    import pandas as pd
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.replace([np.inf, -np.inf], np.nan).to_excel(writer, sheet_name=sheet_name, index=False)
+    data = output.getvalue()
+    if compression:
+        from utils.packaging import repack_package
+        data = repack_package(data, compression)
+
+    write_atomic(path, data)
+
+def compact_historical(historical_path: str, archive_path: str, horizon_months: int,
+                       compression: str = 'small') -> Dict[str, int]:
+    """
+    Move the rows older than horizon_months from the historical workbook into the archive.
+
+    Cold rows are appended to the archive workbook (created if missing and
+    repacked with compression), then the working workbook is rewritten with
+    the recent rows only. The archive is written first, so an interruption
+    can leave a month in both files but never in neither; merge_hot_cold
+    resolves such overlaps. Returns {sheet name: rows archived}.
+    """
+    import pandas as pd
+
+    sheets = read_sheets(historical_path)
+    if not sheets:
+        raise Exception(f"Error compacting historical data: {historical_path} not found or empty")
+    hot, cold = split_hot_cold(sheets, horizon_months)
+    if not cold:
+        print(f"Nothing older than {horizon_months} months to archive")
+        return {}
+
+    archive = read_sheets(archive_path)
+    for sheet_name, rows in cold.items():
+        previous = archive.get(sheet_name)
+        if previous is not None and not previous.empty:
+            rows = pd.concat([previous[~previous['Months'].isin(rows['Months'])], rows], ignore_index=True)
+        archive[sheet_name] = rows
+
+    write_sheets(archive_path, archive, compression=compression)
+    write_sheets(historical_path, hot)
+
+    archived = {sheet_name: len(rows) for sheet_name, rows in cold.items()}
+    print(f"Archived {sum(archived.values())} rows from {len(archived)} sheets to {archive_path}")
+    return archived
+
+def load_full_history(historical_path: str, archive_path: str) -> Dict[str, 'pd.DataFrame']:
+    """Merge view of the working workbook and its archive (see merge_hot_cold)"""
+    return merge_hot_cold(read_sheets(historical_path), read_sheets(archive_path))
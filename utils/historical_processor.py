@@ -1,12 +1,37 @@
 # utils/historical_processor.py
+import io
+import os
+import shutil
 import pandas as pd
 from datetime import datetime
 from utils.date_formatter import TurkishDateFormatter
+from utils.aggregate_cache import AggregateCache
+from utils.file_handler import staged_path, commit_staged
 import numpy as np
 
+# Rating question asked for each politician, formatted with the politician's name
+POLITICIAN_SUCCESS_COLUMN = 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [{}]'
+
+# Every rated politician, in the order of the current success chart
+POLITICIANS = [
+    'Recep Tayyip Erdoğan', 'Özgür Özel', 'Ekrem İmamoğlu', 'Devlet Bahçeli', 'Tülay Hatimoğulları Oruç',
+    'Mansur Yavaş', 'Mahmut Arıkan', 'Muharrem İnce', 'Ümit Özdağ', 'Erkan Baş', 'Fatih Erbakan',
+    'Müsavat Dervişoğlu', 'Yavuz Ağıralioğlu'
+]
+
 class HistoricalDataProcessor:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, sheets: dict = None, report_date: datetime = None, store=None):
         self.file_path = file_path
+        # Optional {sheet name: DataFrame} already parsed from file_path (e.g. from the app cache)
+        self.sheets = sheets
+        # Optional HistoricalStore: sheets are read from it instead of file_path and
+        # saves are upserted into it (and still written to file_path when there is one)
+        self.store = store
+        # Month the new rows are labelled with; None means the current month
+        self.report_date = report_date
+        # Mapped columns and weighted sums of the survey being processed (see AggregateCache);
+        # the pipeline may set one shared with the table updaters
+        self.aggregates = None
         self.date_formatter = TurkishDateFormatter()
         self.sheet_names = {
             'party_votes': 'party_votes',
@@ -78,6 +103,12 @@ class HistoricalDataProcessor:
         
     def read_historical_data(self, sheet_name: str = 'party_votes') -> pd.DataFrame:
         """Read historical data from the specified sheet"""
+        if self.sheets is not None:
+            # Processors append to the frame they get back, so never hand out the shared copy
+            return self.sheets[sheet_name].copy() if sheet_name in self.sheets else pd.DataFrame()
+        if self.store is not None:
+            return self.store.read_sheet(sheet_name)
+        
         try:
             df = pd.read_excel(self.file_path, sheet_name=sheet_name)
             return df
@@ -85,26 +116,30 @@ class HistoricalDataProcessor:
             print(f"Error reading historical data from sheet {sheet_name}: {str(e)}")
             return pd.DataFrame()
 
+    def _aggregates(self, survey_data: pd.DataFrame) -> AggregateCache:
+        """Aggregate cache for survey_data, created on first use"""
+        self.aggregates = AggregateCache.for_frame(self.aggregates, survey_data)
+        return self.aggregates
+
     def process_party_votes(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process main party votes"""
         df = self.read_historical_data('party_votes')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
-        # Map party names
-        survey_data['mapped_party'] = survey_data['parti'].map(self.party_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Calculate percentages
-        total_weight = survey_data['duzeltilmis_agirlik'].sum()
+        total_weight = aggregates.weighted_sum()
         party_percentages = {}
         
         for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP', 'Kararsız', 'Oy Kullanmam']:
-            party_data = survey_data[survey_data['mapped_party'] == party]
-            percentage = (party_data['duzeltilmis_agirlik'].sum() / total_weight * 100) if total_weight > 0 else 0
+            party_weight = aggregates.weighted_sum(('parti', self.party_mapping, [party]))
+            percentage = (party_weight / total_weight * 100) if total_weight > 0 else 0
             party_percentages[party] = percentage
         
         # Calculate Diğer
-        other_parties = survey_data[~survey_data['mapped_party'].isin(party_percentages.keys())]
-        party_percentages['Diğer'] = (other_parties['duzeltilmis_agirlik'].sum() / total_weight * 100) if total_weight > 0 else 0
+        other_weight = aggregates.weighted_sum(('parti', self.party_mapping, list(party_percentages.keys()), True))
+        party_percentages['Diğer'] = (other_weight / total_weight * 100) if total_weight > 0 else 0
         
         # Create new row
         if df.empty:
@@ -115,16 +150,15 @@ class HistoricalDataProcessor:
 
     def process_education_breakdown(self, survey_data: pd.DataFrame) -> dict:
         """Process education breakdown for each party"""
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         results = {}
         
-        # Map party names
-        survey_data['mapped_party'] = survey_data['parti'].map(self.party_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # First calculate totals for each education level
         education_totals = {}
         for education_level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
-            education_totals[education_level] = survey_data[survey_data['education'] == education_level]['duzeltilmis_agirlik'].sum()
+            education_totals[education_level] = aggregates.weighted_sum(('education', None, [education_level]))
         
         for party_original, party_mapped in self.party_mapping.items():
             sheet_suffix = {
@@ -144,13 +178,12 @@ class HistoricalDataProcessor:
             df = self.read_historical_data(sheet_name)
             
             # Calculate percentages by education level (column percentages)
-            party_data = survey_data[survey_data['mapped_party'] == party_mapped]
             education_percentages = {}
             
             for education_level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
                 level_total = education_totals[education_level]
-                level_data = party_data[party_data['education'] == education_level]
-                percentage = (level_data['duzeltilmis_agirlik'].sum() / level_total * 100) if level_total > 0 else 0
+                level_data_weight = aggregates.weighted_sum(('parti', self.party_mapping, [party_mapped]), ('education', None, [education_level]))
+                percentage = (level_data_weight / level_total * 100) if level_total > 0 else 0
                 education_percentages[education_level] = percentage
             
             # Create or update DataFrame
@@ -164,16 +197,15 @@ class HistoricalDataProcessor:
 
     def process_age_breakdown(self, survey_data: pd.DataFrame) -> dict:
         """Process age breakdown for each party"""
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         results = {}
         
-        # Map party names
-        survey_data['mapped_party'] = survey_data['parti'].map(self.party_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # First calculate totals for each age group
         age_totals = {}
         for age_group in ['18-34', '35-54', '55 ve üstü']:
-            age_totals[age_group] = survey_data[survey_data['age_group_second'] == age_group]['duzeltilmis_agirlik'].sum()
+            age_totals[age_group] = aggregates.weighted_sum(('age_group_second', None, [age_group]))
         
         for party_original, party_mapped in self.party_mapping.items():
             sheet_suffix = {
@@ -193,13 +225,12 @@ class HistoricalDataProcessor:
             df = self.read_historical_data(sheet_name)
             
             # Calculate percentages by age group (column percentages)
-            party_data = survey_data[survey_data['mapped_party'] == party_mapped]
             age_percentages = {}
             
             for age_group in ['18-34', '35-54', '55 ve üstü']:
                 group_total = age_totals[age_group]
-                group_data = party_data[party_data['age_group_second'] == age_group]
-                percentage = (group_data['duzeltilmis_agirlik'].sum() / group_total * 100) if group_total > 0 else 0
+                group_data_weight = aggregates.weighted_sum(('parti', self.party_mapping, [party_mapped]), ('age_group_second', None, [age_group]))
+                percentage = (group_data_weight / group_total * 100) if group_total > 0 else 0
                 age_percentages[age_group] = percentage
             
             # Create or update DataFrame
@@ -214,21 +245,19 @@ class HistoricalDataProcessor:
     def process_2023_party_breakdown(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process 2023 party breakdown data"""
         df = self.read_historical_data('party_votes_2023')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
-        # Map current and 2023 party names
-        survey_data['mapped_party'] = survey_data['parti'].map(self.party_mapping)
-        survey_data['mapped_2023_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
+        aggregates = self._aggregates(survey_data)
         
         # Calculate percentages for each 2023 party choice
         party_percentages = {}
         for party_2023 in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-            party_2023_data = survey_data[survey_data['mapped_2023_party'] == party_2023]
-            total_weight = party_2023_data['duzeltilmis_agirlik'].sum()
+            voted_2023 = ('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023, [party_2023])
+            total_weight = aggregates.weighted_sum(voted_2023)
             
             if total_weight > 0:
-                current_party_data = party_2023_data[party_2023_data['mapped_party'] == party_2023]
-                percentage = (current_party_data['duzeltilmis_agirlik'].sum() / total_weight * 100)
+                retained_weight = aggregates.weighted_sum(voted_2023, ('parti', self.party_mapping, [party_2023]))
+                percentage = (retained_weight / total_weight * 100)
             else:
                 percentage = 0
                 
@@ -251,22 +280,21 @@ class HistoricalDataProcessor:
     def process_econ_main(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process main economic situation data"""
         df = self.read_historical_data('econ_main')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_current_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
         
-        # Map economic responses
-        survey_data['econ_current_mapped'] = survey_data[econ_current_col].map(self.econ_current_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Calculate total weight
-        total_weight = survey_data['duzeltilmis_agirlik'].sum()
+        total_weight = aggregates.weighted_sum()
         
         # Calculate percentages for each response group (row percentages)
         percentages = {}
         for response in ['Çok kötü / Kötü', 'Ne iyi ne kötü', 'Çok İyi / İyi']:
-            response_data = survey_data[survey_data['econ_current_mapped'] == response]
-            percentage = (response_data['duzeltilmis_agirlik'].sum() / total_weight * 100) if total_weight > 0 else 0
+            response_weight = aggregates.weighted_sum((econ_current_col, self.econ_current_mapping, [response]))
+            percentage = (response_weight / total_weight * 100) if total_weight > 0 else 0
             percentages[response] = percentage
         
         # Create or update DataFrame
@@ -279,23 +307,22 @@ class HistoricalDataProcessor:
     def process_econ_negative_party(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process economic situation breakdown by party (negative responses only)"""
         df = self.read_historical_data('econ_negative_party')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_current_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
         
-        # Map party names and economic responses
-        survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-        survey_data['econ_current_mapped'] = survey_data[econ_current_col].map(self.econ_current_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses only
-        negative_responses = survey_data[survey_data['econ_current_mapped'] == 'Çok kötü / Kötü']
+        negative = (econ_current_col, self.econ_current_mapping, ['Çok kötü / Kötü'])
         
         # Calculate percentages for each party
         party_percentages = {}
         for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-            party_total = survey_data[survey_data['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
-            party_negative = negative_responses[negative_responses['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
+            voted_2023 = ('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023, [party])
+            party_total = aggregates.weighted_sum(voted_2023)
+            party_negative = aggregates.weighted_sum(negative, voted_2023)
             percentage = (party_negative / party_total * 100) if party_total > 0 else 0
             party_percentages[party] = percentage
         
@@ -309,22 +336,21 @@ class HistoricalDataProcessor:
     def process_econ_negative_age(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process economic situation breakdown by age (negative responses only)"""
         df = self.read_historical_data('econ_negative_age')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_current_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
         
-        # Map economic responses
-        survey_data['econ_current_mapped'] = survey_data[econ_current_col].map(self.econ_current_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses only
-        negative_responses = survey_data[survey_data['econ_current_mapped'] == 'Çok kötü / Kötü']
+        negative = (econ_current_col, self.econ_current_mapping, ['Çok kötü / Kötü'])
         
         # Calculate percentages for each age group
         age_percentages = {}
         for age_group in ['18-34', '35-54', '55 ve üstü']:
-            age_total = survey_data[survey_data['age_group_second'] == age_group]['duzeltilmis_agirlik'].sum()
-            age_negative = negative_responses[negative_responses['age_group_second'] == age_group]['duzeltilmis_agirlik'].sum()
+            age_total = aggregates.weighted_sum(('age_group_second', None, [age_group]))
+            age_negative = aggregates.weighted_sum(negative, ('age_group_second', None, [age_group]))
             percentage = (age_negative / age_total * 100) if age_total > 0 else 0
             age_percentages[age_group] = percentage
         
@@ -338,22 +364,21 @@ class HistoricalDataProcessor:
     def process_econ_negative_education(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process economic situation breakdown by education (negative responses only)"""
         df = self.read_historical_data('econ_negative_education')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_current_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
         
-        # Map economic responses
-        survey_data['econ_current_mapped'] = survey_data[econ_current_col].map(self.econ_current_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses only
-        negative_responses = survey_data[survey_data['econ_current_mapped'] == 'Çok kötü / Kötü']
+        negative = (econ_current_col, self.econ_current_mapping, ['Çok kötü / Kötü'])
         
         # Calculate percentages for each education level
         education_percentages = {}
         for education_level in ['İlköğretim ve altı', 'Lise', 'Yüksekokul ve üzeri']:
-            edu_total = survey_data[survey_data['education'] == education_level]['duzeltilmis_agirlik'].sum()
-            edu_negative = negative_responses[negative_responses['education'] == education_level]['duzeltilmis_agirlik'].sum()
+            edu_total = aggregates.weighted_sum(('education', None, [education_level]))
+            edu_negative = aggregates.weighted_sum(negative, ('education', None, [education_level]))
             percentage = (edu_negative / edu_total * 100) if edu_total > 0 else 0
             education_percentages[education_level] = percentage
         
@@ -367,22 +392,21 @@ class HistoricalDataProcessor:
     def process_econ_future_main(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process main future economic situation data"""
         df = self.read_historical_data('econ_future_main')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_future_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
         
-        # Map economic responses
-        survey_data['econ_future_mapped'] = survey_data[econ_future_col].map(self.econ_future_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Calculate total weight
-        total_weight = survey_data['duzeltilmis_agirlik'].sum()
+        total_weight = aggregates.weighted_sum()
         
         # Calculate percentages for each response group (row percentages)
         percentages = {}
         for response in ['Çok Daha Kötü/Daha Kötü', 'Değişmez', 'Çok Daha İyi/Daha İyi']:
-            response_data = survey_data[survey_data['econ_future_mapped'] == response]
-            percentage = (response_data['duzeltilmis_agirlik'].sum() / total_weight * 100) if total_weight > 0 else 0
+            response_weight = aggregates.weighted_sum((econ_future_col, self.econ_future_mapping, [response]))
+            percentage = (response_weight / total_weight * 100) if total_weight > 0 else 0
             percentages[response] = percentage
         
         # Create or update DataFrame
@@ -395,23 +419,22 @@ class HistoricalDataProcessor:
     def process_econ_future_party(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process future economic situation breakdown by party (negative responses only)"""
         df = self.read_historical_data('econ_future_party')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_future_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
         
-        # Map party names and economic responses
-        survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-        survey_data['econ_future_mapped'] = survey_data[econ_future_col].map(self.econ_future_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses only
-        negative_responses = survey_data[survey_data['econ_future_mapped'] == 'Çok Daha Kötü/Daha Kötü']
+        negative = (econ_future_col, self.econ_future_mapping, ['Çok Daha Kötü/Daha Kötü'])
         
         # Calculate percentages for each party
         party_percentages = {}
         for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-            party_total = survey_data[survey_data['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
-            party_negative = negative_responses[negative_responses['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
+            voted_2023 = ('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023, [party])
+            party_total = aggregates.weighted_sum(voted_2023)
+            party_negative = aggregates.weighted_sum(negative, voted_2023)
             percentage = (party_negative / party_total * 100) if party_total > 0 else 0
             party_percentages[party] = percentage
         
@@ -425,22 +448,21 @@ class HistoricalDataProcessor:
     def process_econ_future_age(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process future economic situation breakdown by age (negative responses only)"""
         df = self.read_historical_data('econ_future_age')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         econ_future_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
         
-        # Map economic responses
-        survey_data['econ_future_mapped'] = survey_data[econ_future_col].map(self.econ_future_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses only
-        negative_responses = survey_data[survey_data['econ_future_mapped'] == 'Çok Daha Kötü/Daha Kötü']
+        negative = (econ_future_col, self.econ_future_mapping, ['Çok Daha Kötü/Daha Kötü'])
         
         # Calculate percentages for each age group
         age_percentages = {}
         for age_group in ['18-34', '35-54', '55 ve üstü']:
-            age_total = survey_data[survey_data['age_group_second'] == age_group]['duzeltilmis_agirlik'].sum()
-            age_negative = negative_responses[negative_responses['age_group_second'] == age_group]['duzeltilmis_agirlik'].sum()
+            age_total = aggregates.weighted_sum(('age_group_second', None, [age_group]))
+            age_negative = aggregates.weighted_sum(negative, ('age_group_second', None, [age_group]))
             percentage = (age_negative / age_total * 100) if age_total > 0 else 0
             age_percentages[age_group] = percentage
         
@@ -453,70 +475,66 @@ class HistoricalDataProcessor:
 
     def calculate_politician_success(self, survey_data: pd.DataFrame, politician_col: str) -> float:
         """Calculate success rate for a single politician"""
-        # Get the data for this politician
-        politician_data = survey_data[politician_col].copy()
-        
-        # Remove 'Tanımıyorum' responses
-        valid_responses = survey_data[politician_data != 'Tanımıyorum (Anketör Dikkat: Okumayın)']
-        
-        # Create pivot table
-        pivot = pd.pivot_table(
-            valid_responses,
-            values='duzeltilmis_agirlik',
-            index=politician_col,
-            aggfunc='sum',
-            margins=True
+        politician = politician_col[politician_col.rindex('[') + 1:-1]
+        rates = self.calculate_politician_success_rates(survey_data)
+        if politician in rates:
+            return rates[politician]
+        return self._score_politician_columns(survey_data, {politician: politician_col})[politician]
+
+    def calculate_politician_success_rates(self, survey_data: pd.DataFrame) -> dict:
+        """Success rates of every politician in POLITICIANS, computed once per survey frame"""
+        columns = {politician: POLITICIAN_SUCCESS_COLUMN.format(politician) for politician in POLITICIANS}
+        return self._aggregates(survey_data).get(
+            ('politician_success',), lambda: self._score_politician_columns(survey_data, columns)
         )
-        
-        # Calculate percentages
-        pivot_pct = pivot / pivot.loc['All'] * 100
-        
-        
-        # Calculate success rate
-        success_scores = {}
-        for index in pivot.index:
-            if index != 'All':
-                if index == "1=Çok başarısız":
-                    score = 1
-                elif index == "10=Çok başarılı":
-                    score = 10
-                else:
-                    try:
-                        score = int(index)
-                    except:
-                        continue
-                
-                success_scores[score] = pivot_pct.loc[index, 'duzeltilmis_agirlik']
-        
-        # Calculate weighted average (SUMPRODUCT equivalent)
-        success_rate = round(sum(score * (percentage/100) for score, percentage in success_scores.items()), 1)
-        
-        
-        return success_rate
+
+    def _score_politician_columns(self, survey_data: pd.DataFrame, columns: dict) -> dict:
+        """
+        Weighted mean 1-10 score of each {politician: column}, rounded to one decimal.
+
+        All columns are stacked into one array and summed per politician with
+        np.bincount. 'Tanımıyorum' and empty answers are left out; answers that
+        are not a score still count towards the total weight, as in the pivot
+        table this replaces.
+        """
+        responses = survey_data[list(columns.values())]
+        n_rows, n_cols = responses.shape
+        
+        # Column-major, so answer i belongs to politician i // n_rows
+        codes, labels = pd.factorize(responses.to_numpy().ravel(order='F'))
+        weights = np.tile(survey_data['duzeltilmis_agirlik'].to_numpy(dtype=float), n_cols)
+        politician_idx = np.repeat(np.arange(n_cols), n_rows)
+        
+        # Score labels are parsed once per distinct answer, not once per row; the
+        # extra trailing entry is what empty answers (code -1) look up
+        label_scores = np.array([self._parse_success_score(label) for label in labels] + [np.nan])
+        label_known = np.array([label != 'Tanımıyorum (Anketör Dikkat: Okumayın)' for label in labels] + [False])
+        
+        valid = label_known[codes] & ~np.isnan(weights)
+        scores = label_scores[codes]
+        scored = valid & ~np.isnan(scores)
+        
+        totals = np.bincount(politician_idx[valid], weights=weights[valid], minlength=n_cols)
+        sums = np.bincount(politician_idx[scored], weights=weights[scored] * scores[scored], minlength=n_cols)
+        rates = np.divide(sums, totals, out=np.zeros(n_cols), where=totals > 0)
+        
+        return {politician: round(float(rate), 1) for politician, rate in zip(columns, rates)}
+
+    @staticmethod
+    def _parse_success_score(label) -> float:
+        """Map an answer label to its 1-10 score (NaN when it is not a score)"""
+        if label == "1=Çok başarısız":
+            return 1
+        if label == "10=Çok başarılı":
+            return 10
+        try:
+            return int(label)
+        except (TypeError, ValueError):
+            return np.nan
 
     def process_politician_success(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process current month's politician success rates"""
-        # Define the mapping of politicians to their question columns
-        politician_columns = {
-            'Recep Tayyip Erdoğan': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Recep Tayyip Erdoğan]',
-            'Özgür Özel': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Özgür Özel]',
-            'Ekrem İmamoğlu': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Ekrem İmamoğlu]',
-            'Devlet Bahçeli': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Devlet Bahçeli]',
-            'Tülay Hatimoğulları Oruç': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Tülay Hatimoğulları Oruç]',
-            'Mansur Yavaş': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Mansur Yavaş]',
-            'Mahmut Arıkan': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Mahmut Arıkan]',
-            'Muharrem İnce': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Muharrem İnce]',
-            'Ümit Özdağ': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Ümit Özdağ]',
-            'Erkan Baş': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Erkan Baş]',
-            'Fatih Erbakan': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Fatih Erbakan]',
-            'Müsavat Dervişoğlu': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Müsavat Dervişoğlu]',
-            'Yavuz Ağıralioğlu': 'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [Yavuz Ağıralioğlu]'
-        }
-        
-        # Calculate success rates for all politicians
-        success_rates = {}
-        for politician, column in politician_columns.items():
-            success_rates[politician] = self.calculate_politician_success(survey_data, column)
+        success_rates = self.calculate_politician_success_rates(survey_data)
         
         # Create DataFrame for the chart
         return pd.DataFrame(list(success_rates.items()), columns=['Politician', 'Success Rate'])
@@ -524,7 +542,7 @@ class HistoricalDataProcessor:
     def process_politician_success_main(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process historical data for main politicians' success rates"""
         df = self.read_historical_data('politician_success_main')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Replace 0s with None in historical data
         if not df.empty:
@@ -534,10 +552,10 @@ class HistoricalDataProcessor:
         main_politicians = ['Recep Tayyip Erdoğan', 'Özgür Özel', 'Devlet Bahçeli', 
                           'Ekrem İmamoğlu', 'Mansur Yavaş', 'Fatih Erbakan']
         
+        all_rates = self.calculate_politician_success_rates(survey_data)
         success_rates = {}
         for politician in main_politicians:
-            column = f'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [{politician}]'
-            rate = self.calculate_politician_success(survey_data, column)
+            rate = all_rates[politician]
             success_rates[politician] = rate if rate > 0 else None
         
         # Create or update DataFrame
@@ -550,7 +568,7 @@ class HistoricalDataProcessor:
     def process_politician_success_second(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process historical data for secondary politicians' success rates"""
         df = self.read_historical_data('politician_success_second')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Replace 0s with None in historical data
         if not df.empty:
@@ -560,10 +578,10 @@ class HistoricalDataProcessor:
         second_politicians = ['Muharrem İnce', 'Erkan Baş', 'Ümit Özdağ', 'Müsavat Dervişoğlu',
                             'Tülay Hatimoğulları Oruç', 'Yavuz Ağıralioğlu', 'Mahmut Arıkan']
         
+        all_rates = self.calculate_politician_success_rates(survey_data)
         success_rates = {}
         for politician in second_politicians:
-            column = f'Sayacağım siyasetçileri 1-10 arası ne kadar başarılı buluyorsunuz? Lütfen tanımadığınız siyasetçi olursa belirtiniz. (1=Çok başarısız, 10=Çok başarılı) [{politician}]'
-            rate = self.calculate_politician_success(survey_data, column)
+            rate = all_rates[politician]
             success_rates[politician] = rate if rate > 0 else None
         
         # Create or update DataFrame
@@ -576,7 +594,7 @@ class HistoricalDataProcessor:
     def process_subsistence(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process main subsistence data"""
         df = self.read_historical_data('subsistence')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         subsistence_col = self._find_column(survey_data, "Aşağıdaki sayılan ifadelerden hangisine katılırsınız")
@@ -597,16 +615,16 @@ class HistoricalDataProcessor:
             'Geçtiğimiz ay gelirim giderlerimi fazlasıyla karşıladı.': 'Gelirim giderlerimi fazlasıyla karşıladı.'
         }
         
-        survey_data['mapped_subsistence'] = survey_data[subsistence_col].map(response_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Calculate total weight
-        total_weight = survey_data['duzeltilmis_agirlik'].sum()
+        total_weight = aggregates.weighted_sum()
         
         # Calculate percentages for each response (row percentages)
         percentages = {}
         for response in responses:
-            response_data = survey_data[survey_data['mapped_subsistence'] == response]
-            percentage = (response_data['duzeltilmis_agirlik'].sum() / total_weight * 100) if total_weight > 0 else 0
+            response_weight = aggregates.weighted_sum((subsistence_col, response_mapping, [response]))
+            percentage = (response_weight / total_weight * 100) if total_weight > 0 else 0
             percentages[response] = percentage
         
         # Create or update DataFrame
@@ -619,14 +637,11 @@ class HistoricalDataProcessor:
     def process_subsistence_party(self, survey_data: pd.DataFrame) -> pd.DataFrame:
         """Process subsistence data by party (negative responses only)"""
         df = self.read_historical_data('subsistence_party')
-        current_date = self.date_formatter.format_date(datetime.now())
+        current_date = self.date_formatter.format_date(self.report_date)
         
         # Find the correct column name
         subsistence_col = self._find_column(survey_data, "Aşağıdaki sayılan ifadelerden hangisine katılırsınız")
         
-        # Map party names
-        survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-        
         # Map responses to match exactly
         response_mapping = {
             'Geçtiğimiz ay gelirim giderlerimi karşılamadı.': 'Gelirim giderimi karşılamadı.',
@@ -635,19 +650,17 @@ class HistoricalDataProcessor:
             'Geçtiğimiz ay gelirim giderlerimi fazlasıyla karşıladı.': 'Gelirim giderlerimi fazlasıyla karşıladı.'
         }
         
-        survey_data['mapped_subsistence'] = survey_data[subsistence_col].map(response_mapping)
+        aggregates = self._aggregates(survey_data)
         
         # Filter for negative responses
-        negative_responses = survey_data[
-            (survey_data['mapped_subsistence'] == 'Gelirim giderimi karşılamadı.') |
-            (survey_data['mapped_subsistence'] == 'Gelirim giderimi ucu ucuna karşıladı.')
-        ]
+        negative = (subsistence_col, response_mapping, ['Gelirim giderimi karşılamadı.', 'Gelirim giderimi ucu ucuna karşıladı.'])
         
         # Calculate percentages for each party
         party_percentages = {}
         for party in ['AK Parti', 'CHP', 'DEM Parti', 'İYİ Parti', 'MHP']:
-            party_total = survey_data[survey_data['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
-            party_negative = negative_responses[negative_responses['mapped_party'] == party]['duzeltilmis_agirlik'].sum()
+            voted_2023 = ('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023, [party])
+            party_total = aggregates.weighted_sum(voted_2023)
+            party_negative = aggregates.weighted_sum(negative, voted_2023)
             percentage = (party_negative / party_total * 100) if party_total > 0 else 0
             party_percentages[party] = percentage
         
@@ -658,29 +671,59 @@ class HistoricalDataProcessor:
         df.loc[len(df)] = [current_date] + [party_percentages[col] for col in df.columns[1:]]
         return df
 
+    def save_all(self, historical_data: dict, months: list = None):
+        """
+        Write every updated sheet to the historical workbook in one save.
+
+        historical_data maps sheet names to frames, or to {sheet name: frame}
+        groups as returned by the breakdowns. Other sheets of the workbook are
+        kept. The workbook is loaded and serialised once, into a temporary file
+        next to file_path that is then renamed over it (or into a fresh buffer
+        copied back when file_path is a BytesIO), so a failed save leaves the
+        previous workbook intact. With a store the sheets are upserted into it
+        as well, only the rows of months (Months labels) when given.
+        """
+        if self.store is not None:
+            self.store.save_all(historical_data, months=months)
+            if self.file_path is None:
+                return
+        
+        sheets = {}
+        for sheet_name, data in historical_data.items():
+            sheets.update(data if isinstance(data, dict) else {sheet_name: data})
+        
+        def write(target, append: bool):
+            options = {'mode': 'a', 'if_sheet_exists': 'replace'} if append else {}
+            with pd.ExcelWriter(target, engine='openpyxl', **options) as writer:
+                for sheet_name, df in sheets.items():
+                    df = df.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+        
+        if hasattr(self.file_path, 'getvalue'):
+            existing = self.file_path.getvalue()
+            output = io.BytesIO(existing)
+            write(output, append=bool(existing))
+            self.file_path.seek(0)
+            self.file_path.truncate()
+            self.file_path.write(output.getvalue())
+            self.file_path.seek(0)
+            return
+        
+        exists = os.path.exists(self.file_path)
+        temp_path = staged_path(self.file_path)
+        try:
+            if exists:
+                shutil.copyfile(self.file_path, temp_path)
+            write(temp_path, append=exists)
+            commit_staged(temp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
     def save_updated_data(self, data, sheet_name: str = 'party_votes'):
-        """Save updated data to the specified sheet"""
+        """Save updated data to the specified sheet (a frame, or a {sheet name: frame} group)"""
         try:
-            if isinstance(data, dict):
-                # For education and age breakdowns
-                with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                    for sheet, df in data.items():
-                        df = df.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
-                        df.to_excel(writer, sheet_name=sheet, index=False)
-            else:
-                # For single dataframe updates
-                with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                    data = data.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
-                    data.to_excel(writer, sheet_name=sheet_name, index=False)
-                
+            self.save_all(data if isinstance(data, dict) else {sheet_name: data})
         except Exception as e:
             print(f"Error saving updated data to sheet {sheet_name}: {str(e)}")
-            if "No such file or directory" in str(e):
-                if isinstance(data, dict):
-                    with pd.ExcelWriter(self.file_path) as writer:
-                        for sheet, df in data.items():
-                            df = df.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
-                            df.to_excel(writer, sheet_name=sheet, index=False)
-                else:
-                    data = data.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
-                    data.to_excel(self.file_path, sheet_name=sheet_name, index=False)
\ No newline at end of file
@@ -0,0 +1,80 @@
+# utils/historical_rebuild.py
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Raw wave files carry their month in the name, e.g. survey_2024-03.xlsx or 2024_03.xlsx
+WAVE_MONTH_PATTERN = re.compile(r'(\d{4})[-_](\d{2})')
+
+def find_waves(directory: str) -> List[Tuple[datetime, str]]:
+    """Return (month, path) of every raw survey file in directory, oldest first"""
+    waves = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith('.xlsx') or name.startswith('~$'):
+            continue
+        match = WAVE_MONTH_PATTERN.search(name)
+        if not match:
+            print(f"Skipping {name}: no YYYY-MM in file name")
+            continue
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if month in waves:
+            raise Exception(f"Two survey files for {month:%Y-%m}: {os.path.basename(waves[month])} and {name}")
+        waves[month] = os.path.join(directory, name)
+    return sorted(waves.items())
+
+def compute_wave_rows(month: datetime, survey_path: str) -> Dict[str, 'pd.DataFrame']:
+    """Compute one wave's row of every historical sheet (runs in a worker process)"""
+    from utils.data_processor import DataProcessor
+    from utils.historical_processor import HistoricalDataProcessor
+    from utils.pipeline import prepare_survey_frame, compute_historical_data
+
+    # Without previous sheets every processor returns a frame holding just this month
+    historical_processor = HistoricalDataProcessor(None, sheets={}, report_date=month)
+    survey_df, _ = prepare_survey_frame(survey_path, DataProcessor(), historical_processor)
+    return compute_historical_data(survey_df, historical_processor)
+
+def rebuild_historical(waves: List[Tuple[datetime, str]], output_path: str, max_workers: int = None) -> Dict[str, 'pd.DataFrame']:
+    """
+    Recompute every historical sheet from raw waves and write them to output_path.
+
+    Each wave is processed in its own worker process; the rows are merged in
+    month order, so the result does not depend on which wave finishes first.
+    current_success is taken from the latest wave, as in a monthly run.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not waves:
+        raise Exception("No survey waves to rebuild from")
+
+    rows = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(compute_wave_rows, month, path): month for month, path in waves}
+        for future in as_completed(futures):
+            month = futures[future]
+            try:
+                rows[month] = future.result()
+            except Exception as e:
+                raise Exception(f"Error processing wave {month:%Y-%m}: {str(e)}")
+            print(f"Processed wave {month:%Y-%m} ({len(rows)}/{len(waves)})")
+
+    months = sorted(rows)
+    sheets = {}
+    for sheet_name in rows[months[-1]]:
+        if sheet_name == 'current_success':
+            sheets[sheet_name] = rows[months[-1]][sheet_name]
+        else:
+            sheets[sheet_name] = pd.concat([rows[month][sheet_name] for month in months], ignore_index=True)
+
+    try:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            for sheet_name, df in sheets.items():
+                df = df.replace([np.inf, -np.inf], np.nan).fillna(value=np.nan)
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        print(f"Saved {len(sheets)} sheets covering {len(months)} months to {output_path}")
+    except Exception as e:
+        raise Exception(f"Error saving rebuilt historical data: {str(e)}")
+
+    return sheets
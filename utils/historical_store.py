@@ -0,0 +1,209 @@
+# utils/historical_store.py
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List
+from utils.date_formatter import TurkishDateFormatter
+
+# Columns every monthly table has besides the sheet's own series
+MONTH_KEY = 'month'
+MONTH_LABEL = 'label'
+
+def _quote(name: str) -> str:
+    """SQL identifier for a sheet or column name"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _month_key(month: datetime) -> str:
+    return f"{month:%Y-%m}"
+
+def _value(value):
+    """Python value SQLite can store; missing values become NULL"""
+    import pandas as pd
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+class HistoricalStore:
+    """
+    SQLite store of the historical series, one table per workbook sheet.
+
+    A sheet with a Months column is a family of monthly series: its table is
+    keyed by the month ('YYYY-MM', a WITHOUT ROWID primary key, i.e. a B-tree
+    on the month) and has one column per series, so upserting a month or
+    reading a range of months is a single index lookup or range scan. Other
+    sheets (current_success) are stored as they are and replaced on save.
+    The sheets table keeps the sheet and column order, so the xlsx layout
+    can be exported again.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sheets ('
+                'name TEXT PRIMARY KEY, position INTEGER NOT NULL, columns TEXT NOT NULL, monthly INTEGER NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            return sqlite3.connect(self.path)
+        except Exception as e:
+            raise Exception(f"Error opening historical store {self.path}: {str(e)}")
+
+    def _sheets(self, connection: sqlite3.Connection) -> Dict[str, tuple]:
+        """{sheet name: (columns, monthly)} in workbook order"""
+        rows = connection.execute('SELECT name, columns, monthly FROM sheets ORDER BY position').fetchall()
+        return {name: (json.loads(columns), bool(monthly)) for name, columns, monthly in rows}
+
+    def sheet_names(self) -> List[str]:
+        with closing(self._connect()) as connection:
+            return list(self._sheets(connection))
+
+    def _register(self, connection: sqlite3.Connection, sheet_name: str, columns: list, monthly: bool) -> list:
+        """Create or widen the sheet's table; return its full column list"""
+        sheets = self._sheets(connection)
+        if sheet_name in sheets and sheets[sheet_name][1] != monthly:
+            raise Exception(f"Error storing {sheet_name}: it was stored {'with' if not monthly else 'without'} a Months column")
+        if monthly:
+            reserved = [column for column in columns if str(column).lower() in (MONTH_KEY, MONTH_LABEL)]
+            if reserved:
+                raise Exception(f"Error storing {sheet_name}: reserved column names {reserved}")
+
+        if sheet_name not in sheets:
+            if monthly:
+                definitions = [f'{MONTH_KEY} TEXT PRIMARY KEY', f'{MONTH_LABEL} TEXT NOT NULL']
+                definitions += [_quote(column) for column in columns]
+                connection.execute(f'CREATE TABLE {_quote(sheet_name)} ({", ".join(definitions)}) WITHOUT ROWID')
+            else:
+                definitions = ['position INTEGER PRIMARY KEY'] + [_quote(column) for column in columns]
+                connection.execute(f'CREATE TABLE {_quote(sheet_name)} ({", ".join(definitions)})')
+            known = list(columns)
+            connection.execute(
+                'INSERT INTO sheets (name, position, columns, monthly) VALUES (?, (SELECT COUNT(*) FROM sheets), ?, ?)',
+                (sheet_name, json.dumps(known), int(monthly))
+            )
+            return known
+
+        # Series added since the table was created (e.g. a new party) become new columns
+        known = sheets[sheet_name][0]
+        for column in columns:
+            if column not in known:
+                connection.execute(f'ALTER TABLE {_quote(sheet_name)} ADD COLUMN {_quote(column)}')
+                known.append(column)
+        connection.execute('UPDATE sheets SET columns = ? WHERE name = ?', (json.dumps(known), sheet_name))
+        return known
+
+    def _upsert(self, connection: sqlite3.Connection, sheet_name: str, df: 'pd.DataFrame'):
+        if 'Months' not in df.columns:
+            self._register(connection, sheet_name, [str(column) for column in df.columns], monthly=False)
+            connection.execute(f'DELETE FROM {_quote(sheet_name)}')
+            names = ', '.join(_quote(column) for column in df.columns)
+            placeholders = ', '.join('?' * len(df.columns))
+            connection.executemany(
+                f'INSERT INTO {_quote(sheet_name)} (position, {names}) VALUES (?, {placeholders})',
+                [(position, *map(_value, row)) for position, row in enumerate(df.itertuples(index=False))]
+            )
+            return
+
+        series = [str(column) for column in df.columns if column != 'Months']
+        self._register(connection, sheet_name, series, monthly=True)
+        months = df['Months'].map(TurkishDateFormatter.parse_date)
+        unknown = df['Months'][months.isna()].tolist()
+        if unknown:
+            raise Exception(f"Error storing {sheet_name}: unrecognised month labels {unknown}")
+
+        names = [MONTH_KEY, MONTH_LABEL] + series
+        values = df.drop(columns='Months').itertuples(index=False)
+        updates = ', '.join(f'{_quote(column)} = excluded.{_quote(column)}' for column in names[1:])
+        connection.executemany(
+            f'INSERT INTO {_quote(sheet_name)} ({", ".join(_quote(column) for column in names)}) '
+            f'VALUES ({", ".join("?" * len(names))}) ON CONFLICT ({MONTH_KEY}) DO UPDATE SET {updates}',
+            [
+                (_month_key(month), label, *map(_value, row))
+                for month, label, row in zip(months, df['Months'], values)
+            ]
+        )
+
+    def upsert_sheet(self, sheet_name: str, df: 'pd.DataFrame'):
+        """Insert or update the months of one sheet (replace it when it has no Months column)"""
+        self.save_all({sheet_name: df})
+
+    def save_all(self, historical_data: dict, months: List[str] = None):
+        """
+        Upsert every sheet of historical_data in one transaction.
+
+        historical_data has the shape HistoricalDataProcessor.save_all takes:
+        frames or {sheet name: frame} groups. Months already stored are
+        updated, new months inserted, months not in the frames left as they are.
+        months (Months labels, e.g. the months a run appended) restricts the
+        upsert to those rows, so a monthly run costs one index lookup per sheet;
+        sheets not stored yet are still written in full.
+        """
+        sheets = {}
+        for sheet_name, data in historical_data.items():
+            sheets.update(data if isinstance(data, dict) else {sheet_name: data})
+        try:
+            with closing(self._connect()) as connection, connection:
+                stored = self._sheets(connection)
+                for sheet_name, df in sheets.items():
+                    if months is not None and sheet_name in stored and 'Months' in df.columns:
+                        df = df[df['Months'].isin(months)]
+                    self._upsert(connection, sheet_name, df)
+        except Exception as e:
+            raise Exception(f"Error saving to historical store: {str(e)}")
+
+    def read_sheet(self, sheet_name: str, columns: List[str] = None, start: datetime = None,
+                   end: datetime = None) -> 'pd.DataFrame':
+        """
+        One sheet in the workbook layout, oldest month first; an empty frame if it is not stored.
+
+        columns restricts the series returned; start and end (inclusive)
+        restrict the months, e.g. read_sheet('party_votes_age_chp', ['18-34'],
+        start=datetime(2022, 1, 1)).
+        """
+        import pandas as pd
+
+        with closing(self._connect()) as connection:
+            sheets = self._sheets(connection)
+            if sheet_name not in sheets:
+                return pd.DataFrame()
+            known, monthly = sheets[sheet_name]
+            if columns is not None:
+                missing = [column for column in columns if column not in known]
+                if missing:
+                    raise Exception(f"Error reading {sheet_name} from historical store: unknown columns {missing}")
+            selected = list(columns) if columns is not None else known
+            if not monthly:
+                rows = connection.execute(
+                    f'SELECT {", ".join(_quote(column) for column in selected)} FROM {_quote(sheet_name)} ORDER BY position'
+                ).fetchall()
+                return pd.DataFrame(rows, columns=selected)
+
+            conditions, parameters = [], []
+            if start is not None:
+                conditions.append(f'{MONTH_KEY} >= ?')
+                parameters.append(_month_key(start))
+            if end is not None:
+                conditions.append(f'{MONTH_KEY} <= ?')
+                parameters.append(_month_key(end))
+            where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+            rows = connection.execute(
+                f'SELECT {MONTH_LABEL}{"".join(", " + _quote(column) for column in selected)} '
+                f'FROM {_quote(sheet_name)}{where} ORDER BY {MONTH_KEY}',
+                parameters
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['Months'] + selected)
+
+    def read_all(self) -> Dict[str, 'pd.DataFrame']:
+        """Every stored sheet in the workbook layout and order"""
+        return {sheet_name: self.read_sheet(sheet_name) for sheet_name in self.sheet_names()}
+
+    def import_workbook(self, path: str):
+        """Upsert every sheet of a historical workbook"""
+        from utils.historical_archive import read_sheets
+        self.save_all(read_sheets(path))
+
+    def export_workbook(self, path: str):
+        """Write the stored sheets as a historical workbook"""
+        from utils.historical_archive import write_sheets
+        write_sheets(path, self.read_all())
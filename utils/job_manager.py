@@ -0,0 +1,101 @@
+# utils/job_manager.py
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+class ReportJob:
+    """State of one background report run"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, job_id: str, key=None):
+        self.id = job_id
+        self.key = key
+        self.status = self.QUEUED
+        self.events: List[tuple] = []  # (timestamp, stage) in the order they were reported
+        self.fraction = 0.0  # Share of the pipeline's stages completed
+        self.result = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def report(self, stage: str = None, fraction: float = None):
+        """
+        Record that the job has reached a pipeline stage and/or completed a
+        fraction of its stages (used as the progress callback)
+        """
+        with self._lock:
+            if stage is not None:
+                self.events.append((time.time(), stage))
+            if fraction is not None:
+                self.fraction = max(self.fraction, fraction)
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        with self._lock:
+            return self.events[-1][1] if self.events else None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+class JobManager:
+    """Run report jobs on a shared worker pool and keep their progress and results"""
+    def __init__(self, max_workers: int = 2, retention_seconds: float = 3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args, key=None, **kwargs) -> str:
+        """
+        Queue func(*args, progress=job.report, **kwargs) and return the job id.
+
+        When key is given and a job with the same key is still queued, running
+        or finished without error, that job's id is returned instead of
+        starting a duplicate run.
+        """
+        self.prune()
+        with self._lock:
+            if key is not None:
+                for job in self.jobs.values():
+                    if job.key == key and job.status != ReportJob.FAILED:
+                        return job.id
+
+            job = ReportJob(uuid.uuid4().hex, key)
+            self.jobs[job.id] = job
+
+        self.executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        """Forget finished jobs older than the retention period so their results can be freed"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def _run(self, job: ReportJob, func: Callable, args: tuple, kwargs: dict):
+        job.status = ReportJob.RUNNING
+        try:
+            job.result = func(*args, progress=job.report, **kwargs)
+            job.status = ReportJob.DONE
+        except Exception as e:
+            print(f"Report job {job.id} failed: {str(e)}")
+            print(traceback.format_exc())
+            job.error = str(e)
+            job.status = ReportJob.FAILED
+        finally:
+            job.finished_at = time.time()
@@ -0,0 +1,85 @@
+# utils/packaging.py
+import io
+import os
+import struct
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+# Deflate level for XML and other compressible parts under each policy
+COMPRESSION_LEVELS = {'fast': 1, 'balanced': 6, 'small': 9}
+
+# Media parts that are already compressed are stored as-is. Nested packages
+# (e.g. the workbooks embedded in charts) are still deflated: their zip
+# headers and XML compress well.
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.tif', '.tiff', '.mp3', '.mp4', '.m4a', '.m4v', '.mov', '.wmv', '.avi'
+}
+
+def _compress_part(info: zipfile.ZipInfo, data: bytes, level: int) -> Tuple[int, bytes, int]:
+    """Return (method, payload, crc) for one part; deflate is dropped when it does not pay off"""
+    crc = zlib.crc32(data)
+    if os.path.splitext(info.filename)[1].lower() in STORED_EXTENSIONS or not data:
+        return zipfile.ZIP_STORED, data, crc
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    payload = compressor.compress(data) + compressor.flush()
+    if len(payload) >= len(data):
+        return zipfile.ZIP_STORED, data, crc
+    return zipfile.ZIP_DEFLATED, payload, crc
+
+def _dos_datetime(date_time: tuple) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+def _write_zip(entries: List[Tuple[zipfile.ZipInfo, int, bytes, int, int]]) -> bytes:
+    """Assemble a zip archive from (info, method, payload, crc, size) entries, keeping their order"""
+    output = io.BytesIO()
+    central = io.BytesIO()
+    for info, method, payload, crc, size in entries:
+        name = info.filename.encode('utf-8')
+        flags = 0x800 if not info.filename.isascii() else 0
+        dos_time, dos_date = _dos_datetime(info.date_time)
+        offset = output.tell()
+        output.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, flags, method, dos_time, dos_date,
+                                 crc, len(payload), size, len(name), 0))
+        output.write(name)
+        output.write(payload)
+        central.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, flags, method, dos_time, dos_date,
+                                  crc, len(payload), size, len(name), 0, 0, 0, 0, 0, offset))
+        central.write(name)
+    directory_offset = output.tell()
+    output.write(central.getvalue())
+    output.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(entries), len(entries),
+                             len(central.getvalue()), directory_offset, 0))
+    return output.getvalue()
+
+def repack_package(data: bytes, policy: str = 'balanced', max_workers: int = 1) -> bytes:
+    """
+    Rewrite a pptx/xlsx package with a per-part compression policy.
+
+    Compressed media is stored, every other part is deflated at
+    the policy's level ('fast', 'balanced' or 'small'). With max_workers > 1
+    parts are compressed on a thread pool (zlib releases the GIL). Packages
+    too large for a plain zip are returned unchanged.
+    """
+    if policy not in COMPRESSION_LEVELS:
+        raise Exception(f"Error repacking package: unknown compression policy '{policy}', expected one of {list(COMPRESSION_LEVELS)}")
+    level = COMPRESSION_LEVELS[policy]
+
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        infos = [info for info in package.infolist() if not info.is_dir()]
+        parts = [package.read(info) for info in infos]
+    if len(infos) >= 0xFFFF or any(len(part) >= 0xFFFFFFFF for part in parts) or len(data) >= 0xFFFFFFFF:
+        return data
+
+    if max_workers and max_workers > 1 and len(parts) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            compressed = list(executor.map(_compress_part, infos, parts, [level] * len(parts)))
+    else:
+        compressed = [_compress_part(info, part, level) for info, part in zip(infos, parts)]
+
+    return _write_zip([
+        (info, method, payload, crc, len(part))
+        for info, part, (method, payload, crc) in zip(infos, parts, compressed)
+    ])
@@ -0,0 +1,669 @@
+# utils/pipeline.py
+import os
+import tempfile
+from datetime import datetime
+from functools import partial
+
+# pandas, python-pptx and openpyxl are imported inside process_survey_data at
+# the stage that needs them, so importing this module (from app.py, the CLI
+# or a worker process) stays cheap.
+
+# Turkish month names dictionary
+TURKISH_MONTHS = {
+    1: 'Oca', 2: 'Şub', 3: 'Mar', 4: 'Nis', 
+    5: 'May', 6: 'Haz', 7: 'Tem', 8: 'Ağu',
+    9: 'Eyl', 10: 'Eki', 11: 'Kas', 12: 'Ara'
+}
+
+# Dimensions raking targets may calibrate: name -> (survey column, mapped
+# through HistoricalDataProcessor.party_mapping_2023 with 'Diğer' for the rest).
+# age_group and education are the derived columns added by prepare_survey_frame.
+RAKING_DIMENSIONS = {
+    'age_group': ('age_group_second', False),
+    'gender': ('Katılımcının cinsiyeti?', False),
+    'education': ('education', False),
+    'party_2023': ('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', True)
+}
+
+def get_month_year_suffix(date: datetime = None):
+    now = date or datetime.now()
+    month = TURKISH_MONTHS[now.month]
+    year = str(now.year)[2:]  # Get last two digits of year
+    return f"{month}{year}"
+
+def process_survey_data(survey_file, tr_output_path, en_output_path, historical_file_path, table_template_path,
+                        output_dir=None, historical_sheets=None, chart_index=None, progress=None,
+                        template=None, table_outputs=None, raking_targets=None, memo=None, historical_store=None):
+    """
+    Run the full report pipeline; table workbooks are written to output_dir (temp dir by default).
+
+    survey_file may be a path, a file-like object or an already parsed DataFrame.
+    historical_sheets ({sheet name: DataFrame}) and chart_index (see
+    ChartUpdater.build_chart_index) let callers that cache parsed inputs skip
+    re-reading the historical workbook and re-scanning the template.
+    progress, if given, is called with the label of each stage as it starts
+    ('Reading survey data', 'Processing historical data', 'Saving historical
+    data', 'Updating Turkish charts' and so on for English and for the
+    tables; see build_report_graph) and with (None, fraction of stages
+    completed) as stages finish (see StageGraph.run_async).
+    
+    Every input and output may also be an in-memory buffer: with template
+    given, both decks are read from it and written to tr_output_path and
+    en_output_path (paths or BytesIO), and table_outputs, a (Turkish,
+    English) pair of paths or BytesIO, replaces the files in output_dir.
+    
+    With raking_targets (a dict or JSON file, see RAKING_DIMENSIONS) the
+    survey weights are recomputed by raking instead of read from the upload.
+    memo (a StageMemo) lets reruns reuse the stages whose inputs did not change.
+    """
+    return process_survey_waves(
+        [(None, survey_file)], tr_output_path, en_output_path, historical_file_path, table_template_path,
+        output_dir=output_dir, historical_sheets=historical_sheets, chart_index=chart_index, progress=progress,
+        template=template, table_outputs=table_outputs, raking_targets=raking_targets, memo=memo,
+        historical_store=historical_store
+    )
+
+def process_survey_waves(waves, tr_output_path, en_output_path, historical_file_path, table_template_path,
+                         output_dir=None, historical_sheets=None, chart_index=None, progress=None,
+                         template=None, table_outputs=None, raking_targets=None, memo=None, compression=None,
+                         historical_store=None):
+    """
+    Run the pipeline over several monthly waves, e.g. to backfill past months.
+
+    waves is a list of (month, survey file) pairs in chronological order; month
+    is a datetime (None means the current month). The templates and the
+    historical workbook are loaded once, each wave appends its row to every
+    historical sheet in memory, and the outputs are written once at the end:
+    the historical workbook with all new months, and decks and tables for the
+    last wave. Other arguments and the return value are as for
+    process_survey_data.
+    
+    The run is a graph of stages (see build_report_graph); stages that do not
+    depend on each other, such as the historical save, the charts and the
+    tables, run concurrently on PIPELINE_STAGE_WORKERS threads. Passing a
+    StageMemo shared between runs makes a rerun execute only the stages whose
+    inputs changed, e.g. just the charts when only the PowerPoint template
+    differs. compression ('fast', 'balanced' or 'small', see
+    utils.packaging) repacks every output; None uses OUTPUT_COMPRESSION.
+    historical_store, the path of a SQLite HistoricalStore (None uses
+    HISTORICAL_STORE_PATH), receives the new months' rows of every sheet
+    once the output files are committed (see save_to_store).
+    """
+    try:
+        if not waves:
+            raise Exception("No survey waves given")
+        months = [month for month, _ in waves]
+        if None in months and len(waves) > 1:
+            raise Exception("Every wave needs a month when backfilling several waves")
+        if len(waves) > 1 and any(later <= earlier for earlier, later in zip(months, months[1:])):
+            raise Exception("Waves must be in chronological order, one per month")
+        
+        # Create output paths for tables with month-year suffix
+        if table_outputs is not None:
+            tr_table_output_path, en_table_output_path = table_outputs
+        else:
+            if output_dir is None:
+                output_dir = tempfile.gettempdir()
+            month_year = get_month_year_suffix(months[-1])
+            
+            tr_table_output_path = os.path.join(output_dir, f'Tables_{month_year}.xlsx')
+            en_table_output_path = os.path.join(output_dir, f'Tables_{month_year}_en.xlsx')
+        print(f"Table outputs will be saved to: {tr_table_output_path} and {en_table_output_path}")
+        
+        graph = build_report_graph(
+            waves, historical_file_path, table_template_path,
+            tr_template=template if template is not None else tr_output_path,
+            en_template=template if template is not None else en_output_path,
+            historical_sheets=historical_sheets, chart_index=chart_index,
+            raking_targets=raking_targets, memo=memo
+        )
+        from config.settings import PIPELINE_STAGE_WORKERS, OUTPUT_COMPRESSION
+        from utils.stage_graph import run_blocking
+        if historical_store is None:
+            from config.settings import HISTORICAL_STORE_PATH
+            historical_store = HISTORICAL_STORE_PATH
+        after_commit = {}
+        if historical_store:
+            after_commit['historical_data'] = partial(save_to_store, historical_store, months=months)
+        # Safe from async callers too: with a running loop the run gets its own thread
+        run_blocking(run_and_write_outputs(graph, {
+            'historical_save': historical_file_path,
+            'tr_charts': tr_output_path,
+            'en_charts': en_output_path,
+            'tr_tables': tr_table_output_path,
+            'en_tables': en_table_output_path
+        }, progress=progress, max_workers=PIPELINE_STAGE_WORKERS, compression=compression or OUTPUT_COMPRESSION,
+            after_commit=after_commit))
+        print(f"Executed stages: {', '.join(graph.executed) or 'none'}; reused: {', '.join(graph.reused) or 'none'}")
+        if graph.timings:
+            print("Stage times: " + ', '.join(f"{name} {seconds:.2f}s" for name, seconds in graph.timings.items()))
+        
+        # Return both Turkish and English file paths along with other results
+        return True, "Data processed successfully", tr_table_output_path, en_table_output_path, historical_file_path, tr_output_path, en_output_path
+        
+    except Exception as e:
+        return False, f"Error processing data: {str(e)}", None, None, None, None, None
+
+def build_report_graph(waves, historical_file, table_template, tr_template, en_template, historical_sheets=None,
+                       chart_index=None, raking_targets=None, memo=None):
+    """
+    Describe a report run as a StageGraph.
+
+    Inputs: surveys, options (months and raking targets), historical_file,
+    tr_template, en_template, table_template and chart_windows, each keyed by
+    a hash of its content. Stages:
+        read_survey -> derive_columns -> aggregates -> historical_data
+        read_historical -> historical_data -> historical_save
+        derive_columns + historical_data + template + chart_windows -> tr_charts, en_charts
+        derive_columns + aggregates + table_template -> tr_tables, en_tables
+    Output stages return the bytes of the file they produce.
+    """
+    from utils.stage_graph import StageGraph, content_digest, value_digest
+    
+    targets = None
+    if raking_targets is not None:
+        from utils.raking import load_raking_targets
+        targets = load_raking_targets(raking_targets)
+    # The current month is part of the options so runs in a new month never reuse old labels
+    month_keys = [(month or datetime.now()).strftime('%Y-%m') for month, _ in waves]
+    options = {'months': [month for month, _ in waves], 'raking_targets': targets}
+    
+    graph = StageGraph(memo)
+    graph.add_input('surveys', [survey for _, survey in waves],
+                    value_digest([(key, content_digest(survey)) for key, (_, survey) in zip(month_keys, waves)]))
+    graph.add_input('options', options, value_digest((month_keys, sorted((targets or {}).items()))))
+    graph.add_input('historical_file', historical_file, content_digest(historical_file))
+    graph.add_input('tr_template', tr_template, content_digest(tr_template))
+    graph.add_input('en_template', en_template, content_digest(en_template))
+    graph.add_input('table_template', table_template, content_digest(table_template))
+    from config.settings import CHART_WINDOW_MONTHS, CHART_WINDOWS
+    chart_windows = {'window': CHART_WINDOW_MONTHS, 'windows': dict(CHART_WINDOWS)}
+    graph.add_input('chart_windows', chart_windows, value_digest((CHART_WINDOW_MONTHS, sorted(CHART_WINDOWS.items()))))
+    
+    graph.add_stage('read_survey', read_survey_stage, ['surveys'], label='Reading survey data')
+    graph.add_stage('derive_columns', derive_columns_stage, ['read_survey', 'options'], label='Reading survey data')
+    graph.add_stage('aggregates', aggregates_stage, ['derive_columns'], label='Processing historical data')
+    graph.add_stage('read_historical', lambda source: read_historical_stage(source, historical_sheets),
+                    ['historical_file'], label='Processing historical data')
+    graph.add_stage('historical_data', historical_data_stage,
+                    ['derive_columns', 'aggregates', 'read_historical', 'options'], label='Processing historical data')
+    graph.add_stage('historical_save', historical_save_stage, ['historical_file', 'historical_data'],
+                    label='Saving historical data')
+    for language, label in [('tr', 'Updating Turkish charts'), ('en', 'Updating English charts')]:
+        graph.add_stage(f'{language}_charts', partial(charts_stage, language=language, chart_index=chart_index),
+                        [f'{language}_template', 'derive_columns', 'historical_data', 'chart_windows'], label=label)
+    for language, label in [('tr', 'Updating Turkish tables'), ('en', 'Updating English tables')]:
+        graph.add_stage(f'{language}_tables', partial(tables_stage, language=language),
+                        ['table_template', 'derive_columns', 'aggregates', 'options'], label=label)
+    return graph
+
+def read_survey_stage(surveys: list) -> list:
+    """Parse every wave's survey workbook (DataFrames are passed through)"""
+    import pandas as pd
+    from utils.file_handler import open_buffer
+    
+    frames = []
+    for survey in surveys:
+        try:
+            frames.append(survey if isinstance(survey, pd.DataFrame) else pd.read_excel(open_buffer(survey)))
+        except Exception as e:
+            raise Exception(f"Error reading survey file: {str(e)}")
+    return frames
+
+def derive_columns_stage(frames: list, options: dict) -> list:
+    """Add the derived columns to a copy of every wave; return [(survey DataFrame, party percentages)]"""
+    from utils.data_processor import DataProcessor
+    from utils.historical_processor import HistoricalDataProcessor
+    
+    data_processor = DataProcessor()
+    historical_processor = HistoricalDataProcessor(None, sheets={})
+    return [
+        prepare_survey_frame(frame, data_processor, historical_processor, raking_targets=options['raking_targets'])
+        for frame in frames
+    ]
+
+def aggregates_stage(prepared: list) -> list:
+    """One thread-safe memo of mapped columns and weighted aggregates per wave, shared by every processor"""
+    from utils.aggregate_cache import AggregateCache
+    return [AggregateCache(survey_df) for survey_df, _ in prepared]
+
+def read_historical_stage(historical_file, historical_sheets=None) -> dict:
+    """Parse every sheet of the historical workbook, unless the caller already did"""
+    if historical_sheets is not None:
+        return historical_sheets
+    import pandas as pd
+    from utils.file_handler import open_buffer
+    try:
+        return pd.read_excel(open_buffer(historical_file), sheet_name=None)
+    except Exception as e:
+        print(f"Error reading historical data: {str(e)}")
+        return {}
+
+def historical_data_stage(prepared: list, aggregates: list, sheets: dict, options: dict) -> dict:
+    """
+    Add every wave to the historical sheets; return the last wave's compute_historical_data result.
+
+    A wave for a month the sheets already hold replaces that month's rows in
+    place, so a backfill can be repeated; a new month older than the latest
+    month of the workbook is rejected, since it would be appended out of order.
+    """
+    from utils.date_formatter import TurkishDateFormatter
+    from utils.historical_archive import latest_month
+    from utils.historical_processor import HistoricalDataProcessor
+    
+    sheets = dict(sheets)
+    last_month = latest_month(sheets)
+    historical_processor = HistoricalDataProcessor(None, sheets=sheets)
+    months = options['months']
+    for month, (survey_df, _), wave_aggregates in zip(months, prepared, aggregates):
+        if len(months) > 1:
+            print(f"\nProcessing wave {month:%Y-%m}")
+        label = TurkishDateFormatter.format_date(month)
+        
+        # Drop the rows of this month, remembering where they were
+        positions = {}
+        for sheet_name, df in sheets.items():
+            if 'Months' in df.columns:
+                matches = (df['Months'] == label).to_numpy()
+                if matches.any():
+                    positions[sheet_name] = int(matches.argmax())
+                    sheets[sheet_name] = df[~matches].reset_index(drop=True)
+        if not positions and last_month is not None and TurkishDateFormatter.parse_date(label) < last_month:
+            raise Exception(
+                f"Error processing wave {label}: the historical workbook already ends at "
+                f"{TurkishDateFormatter.format_date(last_month)}; backfill only months it holds or later months"
+            )
+        
+        historical_processor.report_date = month
+        historical_processor.aggregates = wave_aggregates
+        historical_data = compute_historical_data(survey_df, historical_processor)
+        # Processors append the month last; put replaced months back where they were
+        for sheet_name, position in positions.items():
+            df = historical_data.get(sheet_name)
+            if df is not None and position < len(df) - 1:
+                order = list(range(position)) + [len(df) - 1] + list(range(position, len(df) - 1))
+                historical_data[sheet_name] = df.iloc[order].reset_index(drop=True)
+        # Later waves read the sheets back with this month's row in place
+        sheets.update(historical_data)
+        if last_month is None or TurkishDateFormatter.parse_date(label) > last_month:
+            last_month = TurkishDateFormatter.parse_date(label)
+    return historical_data
+
+def historical_save_stage(historical_file, historical_data: dict) -> bytes:
+    """Write the updated sheets into a copy of the historical workbook in one save and return its bytes"""
+    import io
+    from utils.historical_processor import HistoricalDataProcessor
+    from utils.file_handler import open_buffer
+    
+    try:
+        source = open_buffer(historical_file)
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                source = io.BytesIO(f.read())
+    except FileNotFoundError:
+        source = None
+    
+    try:
+        # A missing workbook is written from scratch with every sheet
+        historical_processor = HistoricalDataProcessor(source if source is not None else io.BytesIO())
+        historical_processor.save_all(historical_data)
+        print("Successfully saved historical data")
+    except Exception as e:
+        raise Exception(f"Error saving historical data: {str(e)}")
+    return historical_processor.file_path.getvalue()
+
+def save_to_store(historical_store: str, historical_data: dict, months: list):
+    """
+    Upsert the rows of months (datetimes, None for the current month) into the HistoricalStore at
+    historical_store. Run after the output files are committed, so a failed run never reaches the
+    store; upserts are idempotent, so a run whose store update fails can simply be repeated.
+    """
+    from utils.date_formatter import TurkishDateFormatter
+    from utils.historical_store import HistoricalStore
+    
+    HistoricalStore(historical_store).save_all(
+        historical_data, months=[TurkishDateFormatter.format_date(month) for month in months]
+    )
+    print(f"Updated historical store {historical_store}")
+
+def charts_stage(template, prepared: list, historical_data: dict, chart_windows: dict, language: str,
+                 chart_index=None) -> bytes:
+    """Update every chart of the deck in one language and return the deck's bytes"""
+    import io
+    from utils.chart_updater import ChartUpdater
+    
+    output = io.BytesIO()
+    try:
+        chart_updater = ChartUpdater(output, language=language, chart_index=chart_index, template=template,
+                                     window=chart_windows['window'], windows=chart_windows['windows'])
+        chart_updater.update_all_charts(prepared[-1][1], historical_data)
+        print(f"Successfully updated {'Turkish' if language == 'tr' else 'English'} charts")
+    except Exception as e:
+        raise Exception(f"Error updating charts: {str(e)}")
+    return output.getvalue()
+
+def tables_stage(table_template, prepared: list, aggregates: list, options: dict, language: str) -> bytes:
+    """Fill the table template for the last wave in one language and return the workbook's bytes"""
+    import io
+    from utils.table_updater import TableUpdater
+    
+    output = io.BytesIO()
+    try:
+        print(f"Updating {'Turkish' if language == 'tr' else 'English'} tables...")
+        table_updater = TableUpdater(table_template, output, language=language, report_date=options['months'][-1])
+        table_updater.aggregates = aggregates[-1]
+        table_updater.update_all_tables(prepared[-1][0])
+        print(f"Successfully updated {'Turkish' if language == 'tr' else 'English'} tables")
+    except Exception as e:
+        raise Exception(f"Error updating tables: {str(e)}")
+    return output.getvalue()
+
+async def run_and_write_outputs(graph, destinations: dict, progress=None, max_workers: int = None,
+                                compression: str = None, after_commit: dict = None):
+    """
+    Run graph and write each output stage's bytes to its destination (path or BytesIO).
+
+    Files are written on a separate I/O thread as soon as their stage
+    finishes, overlapping with the stages still computing, into temporary
+    files next to their destinations. Only once every stage has succeeded are
+    they moved into place, keeping the permissions of the files they replace,
+    so a failed run leaves the previous files intact.
+    With a compression policy every package is repacked on the I/O thread
+    before it is written (see utils.packaging.repack_package).
+    after_commit, {stage name: callable}, runs each callable with that stage's
+    output once every file is in place, e.g. to update a store only after a
+    successful run.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.file_handler import staged_path, commit_staged
+    
+    after_commit = after_commit or {}
+    loop = asyncio.get_running_loop()
+    staged = {}
+    
+    async def stage_output(name: str, data: bytes):
+        if name not in destinations:
+            return
+        destination = destinations[name]
+        if compression:
+            from config.settings import OUTPUT_COMPRESSION_WORKERS
+            from utils.packaging import repack_package
+            data = await loop.run_in_executor(
+                io_executor, repack_package, data, compression, OUTPUT_COMPRESSION_WORKERS or os.cpu_count()
+            )
+        if hasattr(destination, 'write'):
+            # In-memory outputs are cheap to fill and may still be an input of other stages
+            staged[name] = data
+            return
+        temp_path = staged_path(destination)
+        staged[name] = temp_path
+        await loop.run_in_executor(io_executor, write_output, temp_path, data)
+    
+    with ThreadPoolExecutor(max_workers=1) as io_executor:
+        try:
+            results = await graph.run_async(list(destinations) + list(after_commit), progress=progress,
+                                            max_workers=max_workers, on_result=stage_output)
+        except BaseException:
+            for staged_output in staged.values():
+                if isinstance(staged_output, str) and os.path.exists(staged_output):
+                    os.remove(staged_output)
+            raise
+    
+    for name, staged_output in staged.items():
+        if isinstance(staged_output, str):
+            commit_staged(staged_output, destinations[name])
+        else:
+            write_output(destinations[name], staged_output)
+    for name, step in after_commit.items():
+        step(results[name])
+
+def write_output(destination, data: bytes):
+    """Write an output's bytes to a path or replace the content of a BytesIO"""
+    if hasattr(destination, 'write'):
+        destination.seek(0)
+        destination.truncate()
+        destination.write(data)
+        destination.seek(0)
+    else:
+        with open(destination, 'wb') as f:
+            f.write(data)
+
+def prepare_survey_frame(survey_file, data_processor, historical_processor, raking_targets=None) -> tuple:
+    """
+    Read one survey wave and add the derived columns; return (survey DataFrame, party percentages).
+    With raking_targets the duzeltilmis_agirlik weights are recomputed by raking.
+    """
+    import pandas as pd
+    
+    try:
+        if isinstance(survey_file, pd.DataFrame):
+            # Derived columns are added below, so work on a private copy
+            survey_df = survey_file.copy()
+        else:
+            survey_df = pd.read_excel(survey_file)
+        print(f"Successfully read survey data with {len(survey_df)} rows")
+    except Exception as e:
+        raise Exception(f"Error reading survey file: {str(e)}")
+    
+    # Set the parti column from the survey question
+    try:
+        survey_df['parti'] = survey_df["Bu Pazar genel seçim olsa hangi partiye oy verirsiniz?"]
+        print("Successfully set parti column")
+    except Exception as e:
+        raise Exception(f"Error setting parti column: {str(e)}")
+    
+    # Create education column
+    def map_education(edu):
+        if edu in ['Doktora', 'Yüksek lisans', 'Yüksekokul veya üniversite mezunu']:
+            return 'Yüksekokul ve üzeri'
+        elif edu == 'Lise ve dengi meslek okulu mezunu':
+            return 'Lise'
+        else:
+            return 'İlköğretim ve altı'
+    
+    try:
+        survey_df['education'] = survey_df['En son mezun olduğunuz eğitim kurumunu belirtir misiniz? Halihazırda eğitiminize devam ediyorsanız lütfen şu anda devam ettiğiniz eğitim seviyesini belirtin.'].apply(map_education)
+        print("Successfully created education column")
+    except Exception as e:
+        raise Exception(f"Error creating education column: {str(e)}")
+    
+    # Create age group column
+    def map_age_group(age):
+        age = int(age)
+        if 18 <= age <= 34:
+            return '18-34'
+        elif 35 <= age <= 54:
+            return '35-54'
+        else:
+            return '55 ve üstü'
+    
+    try:
+        # Find the age column
+        age_col = historical_processor._find_column(survey_df, "Yaşınızı öğrenebilir miyim")
+        survey_df['age_group_second'] = survey_df[age_col].apply(map_age_group)
+        print("Successfully created age group column")
+    except Exception as e:
+        raise Exception(f"Error creating age group column: {str(e)}")
+    
+    if raking_targets is not None:
+        survey_df['duzeltilmis_agirlik'] = rake_survey_weights(survey_df, historical_processor, raking_targets)
+    
+    processed_data = data_processor.process_survey_data(
+        survey_df,
+        "Bu Pazar genel seçim olsa hangi partiye oy verirsiniz?"
+    )
+    
+    return survey_df, processed_data
+
+def rake_survey_weights(survey_df, historical_processor, raking_targets):
+    """Rake equal weights to the target margins of the RAKING_DIMENSIONS in raking_targets"""
+    from config.settings import RAKING_MAX_ITERATIONS, RAKING_TOLERANCE
+    from utils.raking import RakingCalibrator, load_raking_targets
+    
+    targets = load_raking_targets(raking_targets)
+    unknown = [dimension for dimension in targets if dimension not in RAKING_DIMENSIONS]
+    if unknown:
+        raise Exception(f"Error raking weights: unknown dimensions {unknown}, expected some of {list(RAKING_DIMENSIONS)}")
+    
+    margins = {}
+    for dimension in targets:
+        column, use_2023_mapping = RAKING_DIMENSIONS[dimension]
+        if column not in survey_df.columns:
+            raise Exception(f"Error raking weights: survey has no '{column}' column for {dimension}")
+        margins[dimension] = survey_df[column]
+        if use_2023_mapping:
+            margins[dimension] = margins[dimension].map(historical_processor.party_mapping_2023).fillna('Diğer')
+    
+    calibrator = RakingCalibrator(targets, max_iterations=RAKING_MAX_ITERATIONS, tolerance=RAKING_TOLERANCE)
+    weights = calibrator.rake(margins)
+    if not calibrator.converged:
+        print("Warning: using weights from the last raking iteration")
+    return weights
+
+def compute_historical_data(survey_df, historical_processor) -> dict:
+    """Append one wave to every historical sheet; return {key: DataFrame or {sheet name: DataFrame}}"""
+    try:
+        historical_data = {}
+        
+        # Process party votes
+        historical_data['party_votes'] = historical_processor.process_party_votes(survey_df)
+        
+        # Process education breakdown
+        education_data = historical_processor.process_education_breakdown(survey_df)
+        historical_data.update(education_data)
+        
+        # Process age breakdown
+        age_data = historical_processor.process_age_breakdown(survey_df)
+        historical_data.update(age_data)
+        
+        # Process 2023 party data
+        historical_data['party_votes_2023'] = historical_processor.process_2023_party_breakdown(survey_df)
+        
+        # Process economic data
+        historical_data['econ_main'] = historical_processor.process_econ_main(survey_df)
+        historical_data['econ_negative_party'] = historical_processor.process_econ_negative_party(survey_df)
+        historical_data['econ_negative_age'] = historical_processor.process_econ_negative_age(survey_df)
+        historical_data['econ_negative_education'] = historical_processor.process_econ_negative_education(survey_df)
+        historical_data['econ_future_main'] = historical_processor.process_econ_future_main(survey_df)
+        historical_data['econ_future_party'] = historical_processor.process_econ_future_party(survey_df)
+        historical_data['econ_future_age'] = historical_processor.process_econ_future_age(survey_df)
+        
+        # Process politician success data
+        historical_data['current_success'] = historical_processor.process_politician_success(survey_df)
+        historical_data['politician_success_main'] = historical_processor.process_politician_success_main(survey_df)
+        historical_data['politician_success_second'] = historical_processor.process_politician_success_second(survey_df)
+        
+        # Process subsistence data
+        historical_data['subsistence'] = historical_processor.process_subsistence(survey_df)
+        historical_data['subsistence_party'] = historical_processor.process_subsistence_party(survey_df)
+        
+        print("Successfully processed historical data")
+        return historical_data
+    except Exception as e:
+        raise Exception(f"Error processing historical data: {str(e)}")
+
+
+# Keys of the files run_report expects and returns
+UPLOAD_KEYS = ['survey', 'template', 'historical', 'table_template']
+OUTPUT_KEYS = ['tr_output', 'en_output', 'tr_table_output', 'en_table_output', 'historical_output']
+
+def run_report(uploaded_files: dict, survey_df=None, historical_sheets=None, chart_index=None, progress=None,
+               work_dir: str = None, raking_targets=None, memo=None) -> dict:
+    """
+    Run the pipeline on uploaded files and return the outputs in memory.
+
+    uploaded_files maps each of UPLOAD_KEYS to an object with `name` and
+    `getvalue()` (a Streamlit UploadedFile or equivalent). The result maps each
+    of OUTPUT_KEYS to a (file name, bytes) tuple. Raises on failure.
+    progress, raking_targets and memo are forwarded to process_survey_data.
+    By default nothing touches the disk: uploads are read through views of
+    their bytes and every output is written to a BytesIO. When work_dir is
+    given (see utils.workspace.WorkspaceManager) inputs and outputs go through
+    files in it instead, which bounds memory use for very large workbooks.
+    """
+    if work_dir is not None:
+        return _run_report_on_disk(
+            uploaded_files, survey_df, historical_sheets, chart_index, progress, work_dir, raking_targets, memo
+        )
+    
+    import io
+    from utils.file_handler import FileHandler, open_buffer
+    
+    file_handler = FileHandler()
+    if progress is not None:
+        progress('Preparing files')
+    for key in ['historical', 'table_template']:
+        file_handler.verify_excel_file(uploaded_files[key])
+    
+    name_without_ext, ext = os.path.splitext(uploaded_files['template'].name)
+    month_year = get_month_year_suffix()
+    names = {
+        'tr_output': f'{name_without_ext}{ext}',
+        'en_output': f'{name_without_ext}_en{ext}',
+        'tr_table_output': f'Tables_{month_year}.xlsx',
+        'en_table_output': f'Tables_{month_year}_en.xlsx',
+        'historical_output': uploaded_files['historical'].name
+    }
+    # The historical workbook is updated in place; the upload's bytes are only copied on the first write
+    buffers = {key: io.BytesIO() for key in OUTPUT_KEYS}
+    buffers['historical_output'] = open_buffer(uploaded_files['historical'])
+    
+    success, message, *_ = process_survey_data(
+        survey_df if survey_df is not None else open_buffer(uploaded_files['survey']),
+        buffers['tr_output'],
+        buffers['en_output'],
+        buffers['historical_output'],
+        uploaded_files['table_template'],
+        historical_sheets=historical_sheets,
+        chart_index=chart_index,
+        progress=progress,
+        template=uploaded_files['template'],
+        table_outputs=(buffers['tr_table_output'], buffers['en_table_output']),
+        raking_targets=raking_targets,
+        memo=memo
+    )
+    if not success:
+        raise Exception(message)
+    
+    if progress is not None:
+        progress('Collecting outputs')
+    return {key: (names[key], buffers[key].getvalue()) for key in OUTPUT_KEYS}
+
+def _run_report_on_disk(uploaded_files: dict, survey_df, historical_sheets, chart_index, progress, work_dir: str,
+                        raking_targets=None, memo=None) -> dict:
+    """run_report with intermediate files in work_dir"""
+    from utils.file_handler import FileHandler
+    
+    file_handler = FileHandler()
+    if progress is not None:
+        progress('Preparing files')
+    _, tr_output_path, en_output_path = file_handler.create_processed_file(uploaded_files['template'], work_dir)
+    historical_path = file_handler.save_uploaded_file(uploaded_files['historical'], work_dir)
+    table_template_path = file_handler.save_uploaded_file(uploaded_files['table_template'], work_dir)
+    
+    success, message, *output_paths = process_survey_data(
+        survey_df if survey_df is not None else uploaded_files['survey'],
+        tr_output_path,
+        en_output_path,
+        historical_path,
+        table_template_path,
+        output_dir=work_dir,
+        historical_sheets=historical_sheets,
+        chart_index=chart_index,
+        progress=progress,
+        raking_targets=raking_targets,
+        memo=memo
+    )
+    if not success:
+        raise Exception(message)
+    
+    # process_survey_data returns tables, historical, then decks
+    tr_table_path, en_table_path, historical_output_path, tr_path, en_path = output_paths
+    if progress is not None:
+        progress('Collecting outputs')
+    outputs = {}
+    for key, path in zip(OUTPUT_KEYS, [tr_path, en_path, tr_table_path, en_table_path, historical_output_path]):
+        with open(path, 'rb') as f:
+            outputs[key] = (os.path.basename(path), f.read())
+    return outputs
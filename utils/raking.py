@@ -0,0 +1,103 @@
+# utils/raking.py
+import json
+import time
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+def load_raking_targets(targets) -> Dict[str, Dict[str, float]]:
+    """Return raking targets given as a dict or as the path of a JSON file holding one"""
+    if isinstance(targets, dict):
+        return targets
+    try:
+        with open(targets, encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        raise Exception(f"Error reading raking targets: {str(e)}")
+
+class RakingCalibrator:
+    """
+    Iterative proportional fitting of survey weights to population margins.
+
+    targets maps each dimension (e.g. 'age_group', 'gender') to the population
+    share of each of its categories; shares are normalised per dimension, so
+    percentages work as well as fractions. Every dimension is encoded once
+    into integer codes, and each adjustment is a bincount of the weights over
+    those codes followed by one gather of the correction factors.
+    """
+    def __init__(self, targets: Dict[str, Dict[str, float]], max_iterations: int = 100, tolerance: float = 1e-6):
+        if not targets:
+            raise Exception("Error configuring raking: no target margins given")
+        self.targets = {}
+        for dimension, shares in targets.items():
+            total = float(sum(shares.values()))
+            if total <= 0 or any(share < 0 for share in shares.values()):
+                raise Exception(f"Error configuring raking: invalid target shares for {dimension}")
+            self.targets[dimension] = {category: share / total for category, share in shares.items()}
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.history: List[Dict[str, float]] = []
+        self.converged = False
+
+    def _encode(self, dimension: str, values: pd.Series) -> np.ndarray:
+        """Integer codes of values in the order of the dimension's target categories"""
+        categories = list(self.targets[dimension])
+        codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+        unknown = values[codes < 0]
+        if len(unknown):
+            raise Exception(
+                f"Error raking weights: {dimension} has values without a target: {sorted(unknown.astype(str).unique())}"
+            )
+        return codes
+
+    def rake(self, margins: Dict[str, pd.Series], base_weights: pd.Series = None) -> pd.Series:
+        """
+        Calibrate weights so their distribution over every dimension matches the targets.
+
+        margins maps each target dimension to the respondents' category in it.
+        Starts from base_weights (equal weights by default) and returns weights
+        with the same total, i.e. a mean of 1 from equal weights. Per-iteration
+        timing and the largest remaining margin error are kept in history.
+        """
+        missing = [dimension for dimension in self.targets if dimension not in margins]
+        if missing:
+            raise Exception(f"Error raking weights: no survey column for {missing}")
+
+        index = next(iter(margins.values())).index
+        weights = np.ones(len(index)) if base_weights is None else pd.Series(base_weights).to_numpy(dtype=float).copy()
+        total = weights.sum()
+        encoded = []
+        for dimension, shares in self.targets.items():
+            codes = self._encode(dimension, margins[dimension])
+            target_totals = np.fromiter(shares.values(), dtype=float) * total
+            counts = np.bincount(codes, minlength=len(shares))
+            empty = [category for category, count, target in zip(shares, counts, target_totals) if count == 0 and target > 0]
+            if empty:
+                raise Exception(f"Error raking weights: no respondents for {dimension} {empty}")
+            encoded.append((dimension, codes, target_totals))
+
+        self.history = []
+        self.converged = False
+        for iteration in range(1, self.max_iterations + 1):
+            start = time.perf_counter()
+            for _, codes, target_totals in encoded:
+                sums = np.bincount(codes, weights=weights, minlength=len(target_totals))
+                factors = np.divide(target_totals, sums, out=np.zeros_like(sums), where=sums > 0)
+                weights *= factors[codes]
+            max_error = max(
+                np.abs(np.bincount(codes, weights=weights, minlength=len(target_totals)) - target_totals).max() / total
+                for _, codes, target_totals in encoded
+            )
+            elapsed = time.perf_counter() - start
+            self.history.append({'iteration': iteration, 'max_error': max_error, 'seconds': elapsed})
+            print(f"Raking iteration {iteration}: max margin error {max_error:.2e} ({elapsed * 1000:.1f} ms)")
+            if max_error < self.tolerance:
+                self.converged = True
+                break
+
+        if self.converged:
+            print(f"Raking converged after {len(self.history)} iterations")
+        else:
+            print(f"Warning: raking did not converge after {self.max_iterations} iterations "
+                  f"(max margin error {self.history[-1]['max_error']:.2e})")
+        return pd.Series(weights, index=index)
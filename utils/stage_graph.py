@@ -0,0 +1,229 @@
+# utils/stage_graph.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List
+
+def content_digest(source) -> str:
+    """
+    SHA-256 of an input's content: bytes, a file path, a file-like object with
+    getvalue() (BytesIO, Streamlit uploads), a pandas DataFrame, or None.
+    """
+    digest = hashlib.sha256()
+    if source is None:
+        digest.update(b'none')
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, (str, os.PathLike)):
+        if not os.path.exists(source):
+            digest.update(f'missing:{os.fspath(source)}'.encode('utf-8'))
+        else:
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+    elif hasattr(source, 'getvalue'):
+        digest.update(source.getvalue())
+    else:
+        import pandas as pd
+        if not isinstance(source, pd.DataFrame):
+            raise Exception(f"Error hashing stage input: unsupported type {type(source).__name__}")
+        digest.update(repr((list(source.columns), source.shape)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(source, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def value_digest(value) -> str:
+    """SHA-256 of a plain value (numbers, strings, tuples, dicts) through its repr"""
+    return hashlib.sha256(repr(value).encode('utf-8')).hexdigest()
+
+def run_blocking(coroutine):
+    """
+    Run a coroutine to completion and return its result, like asyncio.run.
+    Called from a thread that already runs an event loop (a notebook, an async
+    server), the coroutine runs on its own loop in a helper thread instead.
+    """
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+class StageMemo:
+    """
+    Thread-safe LRU store of stage outputs keyed by (stage name, input hash).
+
+    One memo can be shared by many runs (e.g. every report job of the app), so
+    a rerun only recomputes the stages whose inputs changed. Outputs are shared
+    between runs and must not be modified by the stages that consume them.
+    """
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable) -> tuple:
+        """Return (True, output) when key is stored, otherwise (False, None)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages with memoised outputs.
+
+    Inputs are leaves identified by a content hash; a stage's key is the hash
+    of its name and its dependencies' keys, so it only changes when something
+    upstream changed. Running the graph resolves the requested stages lazily:
+    a stage whose key is in the memo is reused without resolving (or even
+    reading) its own dependencies.
+    """
+    def __init__(self, memo: StageMemo = None):
+        self.memo = memo if memo is not None else StageMemo()
+        self._inputs: Dict[str, tuple] = {}
+        self._stages: Dict[str, tuple] = {}
+        self._keys: Dict[str, str] = {}
+        self.executed: List[str] = []
+        self.reused: List[str] = []
+        # Seconds spent in each executed stage
+        self.timings: Dict[str, float] = {}
+
+    def add_input(self, name: str, value, digest: str):
+        """Register a leaf input with the hash of its content"""
+        self._inputs[name] = (value, digest)
+
+    def add_stage(self, name: str, func: Callable, deps: List[str], label: str = None):
+        """Register a stage computed as func(*outputs of deps); label is reported to progress"""
+        missing = [dep for dep in deps if dep not in self._inputs and dep not in self._stages]
+        if missing:
+            raise Exception(f"Error building stage graph: {name} depends on unknown {missing}")
+        self._stages[name] = (func, list(deps), label or name)
+
+    def dependencies(self, name: str) -> List[str]:
+        """Direct dependencies of a stage (empty for inputs)"""
+        return self._stages[name][1] if name in self._stages else []
+
+    def key(self, name: str) -> str:
+        """Hash identifying the output of name for its current inputs"""
+        if name in self._inputs:
+            return self._inputs[name][1]
+        if name not in self._keys:
+            self._keys[name] = value_digest((name, tuple(self.key(dep) for dep in self.dependencies(name))))
+        return self._keys[name]
+
+    def run(self, targets: List[str], progress: Callable = None, max_workers: int = 1,
+            on_result: Callable = None) -> Dict[str, object]:
+        """Blocking wrapper around run_async (see run_blocking)"""
+        return run_blocking(self.run_async(targets, progress, max_workers, on_result))
+
+    async def run_async(self, targets: List[str], progress: Callable = None, max_workers: int = 1,
+                        on_result: Callable = None) -> Dict[str, object]:
+        """
+        Return {target: output}, executing only the stages that are not memoised.
+
+        Stages whose dependencies are all available run concurrently on a
+        thread pool of max_workers (None sizes it to the machine), so the run
+        takes as long as its slowest chain of dependent stages. on_result, an
+        async callable, is scheduled with (target, output) as soon as each
+        target is ready, e.g. to write a file while other stages still run;
+        the run returns once every on_result call has finished. The first
+        failing stage stops the run and its exception is raised.
+
+        progress is called with a stage's label as it starts and with
+        (None, fraction) each time a stage finishes, fraction being the share
+        of this run's stages completed; stages finish in any order, so only
+        the fraction is monotonic.
+        """
+        import asyncio
+        values = {}
+        pending: Dict[str, List[str]] = {}
+
+        def visit(name: str):
+            if name in values or name in pending:
+                return
+            if name in self._inputs:
+                values[name] = self._inputs[name][0]
+                return
+            found, value = self.memo.lookup((name, self.key(name)))
+            if found:
+                values[name] = value
+                self.reused.append(name)
+                return
+            pending[name] = self.dependencies(name)
+            for dep in pending[name]:
+                visit(dep)
+
+        for name in targets:
+            visit(name)
+
+        def execute(name: str):
+            func, deps, label = self._stages[name]
+            if progress is not None:
+                progress(label)
+            start = time.perf_counter()
+            value = func(*[values[dep] for dep in deps])
+            return value, time.perf_counter() - start
+
+        total, completed = len(pending), 0
+        callbacks = []
+        def target_ready(name: str):
+            if on_result is not None and name in targets:
+                callbacks.append(asyncio.ensure_future(on_result(name, values[name])))
+
+        for name in targets:
+            if name in values:
+                target_ready(name)
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        loop = asyncio.get_running_loop()
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                while pending or running:
+                    # Submit ready stages in the order they were found so single-worker runs are deterministic
+                    for name in [name for name, deps in pending.items() if all(dep in values for dep in deps)]:
+                        running[loop.run_in_executor(executor, execute, name)] = name
+                        del pending[name]
+                    if not running:
+                        raise Exception(f"Error running stage graph: unresolvable stages {list(pending)}")
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        value, elapsed = future.result()
+                        self.memo.store((name, self.key(name)), value)
+                        values[name] = value
+                        self.executed.append(name)
+                        self.timings[name] = elapsed
+                        completed += 1
+                        if progress is not None:
+                            progress(None, completed / total)
+                        target_ready(name)
+            await asyncio.gather(*callbacks)
+        except BaseException:
+            for future in list(running) + callbacks:
+                future.cancel()
+            await asyncio.gather(*running, *callbacks, return_exceptions=True)
+            raise
+
+        return {name: values[name] for name in targets}
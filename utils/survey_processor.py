@@ -1,12 +1,50 @@
 # utils/survey_processor.py
 from typing import Dict, List
+import numpy as np
 import pandas as pd
 
+QUESTION_TYPES = ('single_choice', 'multiple_choice')
+
+class IndicatorMatrix:
+    """
+    Sparse (CSR) respondents x options indicator matrix of a multiple-choice question.
+
+    Row i's selected options are indices[indptr[i]:indptr[i + 1]] (positions
+    in options), so memory grows with the number of selections rather than
+    with respondents x options.
+    """
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, options: pd.Index):
+        self.indptr = indptr
+        self.indices = indices
+        self.options = options
+
+    @classmethod
+    def from_answers(cls, answers: pd.Series, sep: str = ';') -> 'IndicatorMatrix':
+        """Split sep-joined answers like Series.str.get_dummies: options sorted, repeats counted once"""
+        n_rows = len(answers)
+        answered = answers.notna().to_numpy()
+        texts = answers[answered].astype(str).tolist()
+        # One split of all answers joined together instead of one list per respondent
+        selections = sep.join(texts).split(sep) if texts else []
+        rows = np.repeat(np.flatnonzero(answered), [text.count(sep) + 1 for text in texts])
+        codes, options = pd.factorize(np.array(selections, dtype=object), sort=True)
+        # Sorting the (row, option) keys orders the entries row by row and drops repeated selections
+        keys = np.unique(rows.astype(np.int64) * len(options) + codes)
+        rows, indices = np.divmod(keys, max(len(options), 1))
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(indptr, indices, pd.Index(options))
+
+    def transpose_dot(self, weights: np.ndarray) -> np.ndarray:
+        """Weighted total of every option, i.e. indicators.T @ weights"""
+        row_weights = np.repeat(weights, np.diff(self.indptr))
+        return np.bincount(self.indices, weights=row_weights, minlength=len(self.options))
+
 class SurveyProcessor:
     def __init__(self, questions_config: Dict[str, Dict]):
         """
         Initialize with questions configuration
-        
+
         questions_config format:
         {
             'question_column_name': {
@@ -18,75 +56,93 @@ class SurveyProcessor:
         }
         """
         self.questions_config = questions_config
+        self.plan = self.compile_plan(questions_config)
+
+    @staticmethod
+    def compile_plan(questions_config: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+        """
+        Compile the configuration into an execution plan: the questions grouped
+        by weight column, so each weight column is read and totalled once per run.
+        Questions of an unknown type are skipped.
+        """
+        plan = {}
+        for question, config in questions_config.items():
+            if config['type'] not in QUESTION_TYPES:
+                print(f"Skipping {question}: unknown question type {config['type']}")
+                continue
+            plan.setdefault(config.get('weight_column', 'duzeltilmis_agirlik'), []).append({
+                'question': question,
+                'type': config['type'],
+                'mapping': config.get('mapping', {})
+            })
+        return plan
 
     def process_all_questions(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         """Process all configured questions and return their pivot tables"""
         results = {}
-        
-        for question, config in self.questions_config.items():
-            if config['type'] == 'single_choice':
-                results[question] = self._process_single_choice(
-                    df,
-                    question,
-                    config.get('mapping', {}),
-                    config.get('weight_column', 'duzeltilmis_agirlik')
-                )
-            elif config['type'] == 'multiple_choice':
-                results[question] = self._process_multiple_choice(
-                    df,
-                    question,
-                    config.get('mapping', {}),
-                    config.get('weight_column', 'duzeltilmis_agirlik')
-                )
-                
-        return results
+
+        for weight_column, steps in self.plan.items():
+            # Missing weights count as zero, as in a groupby sum
+            weights = df[weight_column].to_numpy(dtype=float, na_value=np.nan)
+            weights = np.where(np.isnan(weights), 0.0, weights)
+            total_weight = weights.sum()
+
+            for step in steps:
+                if step['type'] == 'single_choice':
+                    process = self._process_single_choice
+                else:
+                    process = self._process_multiple_choice
+                results[step['question']] = process(df[step['question']], step['mapping'], weights, total_weight)
+
+        # Results follow the configuration order
+        return {question: results[question] for question in self.questions_config if question in results}
 
     def _process_single_choice(
         self,
-        df: pd.DataFrame,
-        question: str,
+        answers: pd.Series,
         mapping: Dict[str, str],
-        weight_column: str
+        weights: np.ndarray,
+        total_weight: float
     ) -> pd.DataFrame:
         """Process single choice questions"""
-        # Apply mapping if provided
-        if mapping:
-            df = df.copy()
-            df['Response'] = df[question].map(lambda x: mapping.get(x, x))
-        else:
-            df['Response'] = df[question]
+        # Encode the answers once and map only the distinct values, then sum
+        # the weights per mapped response in one pass
+        codes, uniques = pd.factorize(answers)
+        responses = [mapping.get(value, value) for value in uniques] if mapping else list(uniques)
+        response_codes, response_labels = pd.factorize(pd.Index(responses, dtype=object))
+        answered = codes >= 0
+        sums = np.bincount(
+            response_codes[codes[answered]], weights=weights[answered], minlength=len(response_labels)
+        )
 
         # Calculate weighted percentages
-        total_weight = df[weight_column].sum()
-        results = df.groupby('Response')[weight_column].sum().reset_index()
-        results['Percentage'] = (results[weight_column] / total_weight) * 100
-        results['Percentage'] = results['Percentage'].round(1)
+        percentages = pd.Series(sums / total_weight * 100, index=response_labels).sort_index().round(1)
 
-        return results[['Response', 'Percentage']]
+        return pd.DataFrame({
+            'Response': percentages.index,
+            'Percentage': percentages.values
+        })
 
     def _process_multiple_choice(
         self,
-        df: pd.DataFrame,
-        question: str,
+        answers: pd.Series,
         mapping: Dict[str, str],
-        weight_column: str
+        weights: np.ndarray,
+        total_weight: float
     ) -> pd.DataFrame:
         """Process multiple choice questions"""
-        # Split multiple responses and process each option
-        responses = df[question].str.get_dummies(sep=';')
-        
-        # Apply weights
-        weighted_responses = responses.multiply(df[weight_column], axis=0)
-        
+        # Split multiple responses into a sparse indicator matrix and weight each option
+        responses = IndicatorMatrix.from_answers(answers)
+        weighted_totals = responses.transpose_dot(weights)
+
         # Calculate percentages
-        total_weight = df[weight_column].sum()
-        percentages = (weighted_responses.sum() / total_weight * 100).round(1)
-        
+        percentages = pd.Series(weighted_totals / total_weight * 100, index=responses.options).round(1)
+
         # Apply mapping if provided
         if mapping:
             percentages.index = percentages.index.map(lambda x: mapping.get(x, x))
-            
+
         return pd.DataFrame({
             'Response': percentages.index,
             'Percentage': percentages.values
-        })
\ No newline at end of file
+        })
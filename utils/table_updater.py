@@ -4,6 +4,8 @@ from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.formatting.rule import ColorScaleRule
 from config.constants import PARTY_MAPPING
+from utils.file_handler import open_buffer
+from utils.aggregate_cache import AggregateCache
 from datetime import datetime
 import calendar
 import os
@@ -14,6 +16,10 @@ class BaseTableUpdater:
         self.template_path = template_path
         self.output_path = output_path
         self.workbook = None
+        self.report_date = None
+        # Mapped columns and pivots of the survey being tabulated (see AggregateCache);
+        # the pipeline may set one shared with the other language and the historical processor
+        self.aggregates = None
         
         # Turkish month abbreviations
         self.tr_months = {
@@ -116,6 +122,9 @@ class BaseTableUpdater:
             'Erkek': 'Man'
         }
 
+        # Age group labels shortened in the tables; other groups are kept as they are
+        self.age_group_mapping = {'65 ve üstü': '65+'}
+
         self.en_months_mapping = {
             'Oca.': 'Jan.',
             'Şub.': 'Feb.',
@@ -136,18 +145,22 @@ class BaseTableUpdater:
         if self.workbook is None:
             try:
                 print(f"\nLoading workbook from: {self.template_path}")
-                if not os.path.exists(self.template_path):
-                    raise Exception(f"Template file does not exist: {self.template_path}")
-                
-                print(f"File exists, size: {os.path.getsize(self.template_path)} bytes")
-                
-                # Try to read the first few bytes to check if file is accessible
-                with open(self.template_path, 'rb') as f:
-                    first_bytes = f.read(10)
-                    print(f"First few bytes: {first_bytes}")
+                source = open_buffer(self.template_path)
+                if isinstance(source, str):
+                    if not os.path.exists(source):
+                        raise Exception(f"Template file does not exist: {source}")
+                    
+                    print(f"File exists, size: {os.path.getsize(source)} bytes")
+                    
+                    # Try to read the first few bytes to check if file is accessible
+                    with open(source, 'rb') as f:
+                        first_bytes = f.read(10)
+                        print(f"First few bytes: {first_bytes}")
+                else:
+                    print(f"Template is in memory, size: {source.getbuffer().nbytes} bytes")
                 
                 print("Loading workbook with openpyxl...")
-                self.workbook = load_workbook(self.template_path)
+                self.workbook = load_workbook(source)
                 
                 if self.workbook is None:
                     raise Exception("load_workbook returned None")
@@ -172,7 +185,10 @@ class BaseTableUpdater:
             try:
                 print(f"Saving workbook to: {self.output_path}")
                 self.workbook.save(self.output_path)
-                print(f"Successfully saved workbook, size: {os.path.getsize(self.output_path)} bytes")
+                if hasattr(self.output_path, 'getbuffer'):
+                    print(f"Successfully saved workbook in memory, size: {self.output_path.getbuffer().nbytes} bytes")
+                else:
+                    print(f"Successfully saved workbook, size: {os.path.getsize(self.output_path)} bytes")
                 self.workbook = None
             except Exception as e:
                 print(f"Error saving workbook: {str(e)}")
@@ -222,18 +238,29 @@ class BaseTableUpdater:
                 columns=columns,
                 aggfunc=aggfunc
             )
-            
-            if calc_method == 'percent_of_column':
-                pivot_pct = pivot.div(pivot.sum(axis=0), axis=1) * 100
-            elif calc_method == 'percent_of_row':
-                pivot_pct = pivot.div(pivot.sum(axis=1), axis=0) * 100
-            else:
-                raise ValueError(f"Unknown calculation method: {calc_method}")
-                
-            return pivot_pct
+            return self._to_percentages(pivot, calc_method)
         except Exception as e:
             raise Exception(f"Error creating pivot table: {str(e)}")
     
+    def _weighted_pivot(self, survey_data: pd.DataFrame, index: tuple, columns: tuple,
+                        calc_method: str = 'percent_of_column', filters: tuple = ()) -> pd.DataFrame:
+        """Percentage pivot of weights over two (column, mapping, ...) dimensions, via the aggregate cache"""
+        try:
+            self.aggregates = AggregateCache.for_frame(self.aggregates, survey_data)
+            pivot = self.aggregates.weighted_pivot(index, columns, filters)
+            return self._to_percentages(pivot, calc_method)
+        except Exception as e:
+            raise Exception(f"Error creating pivot table: {str(e)}")
+    
+    def _to_percentages(self, pivot: pd.DataFrame, calc_method: str) -> pd.DataFrame:
+        """Turn a pivot of weights into column or row percentages"""
+        if calc_method == 'percent_of_column':
+            return pivot.div(pivot.sum(axis=0), axis=1) * 100
+        elif calc_method == 'percent_of_row':
+            return pivot.div(pivot.sum(axis=1), axis=0) * 100
+        else:
+            raise ValueError(f"Unknown calculation method: {calc_method}")
+    
     def _apply_conditional_formatting(self, worksheet, cell_range: str, color_scale: str = 'white_to_plum'):
         """Apply conditional formatting to specified range"""
         if color_scale == 'white_to_plum':
@@ -254,7 +281,7 @@ class BaseTableUpdater:
     
     def _get_current_month_str(self) -> str:
         """Get current month in specified language format (e.g., 'Oca.24' or 'Jan.24')"""
-        current_date = datetime.now()
+        current_date = self.report_date or datetime.now()
         if self.language == 'tr':
             return f"{self.tr_months[current_date.month]}.{str(current_date.year)[2:]}"
         else:
@@ -301,13 +328,15 @@ class BaseTableUpdater:
                 ws[f'{col}{row}'] = ws[f'{next_col}{row}'].value
 
 class TableUpdater(BaseTableUpdater):
-    def __init__(self, template_path: str, output_path: str, language: str = 'tr'):
+    def __init__(self, template_path: str, output_path: str, language: str = 'tr', report_date: datetime = None):
         super().__init__(template_path, output_path)
         self.language = language
+        # Month written into the table headers; None means the current month
+        self.report_date = report_date
     
     def _get_current_month_str(self) -> str:
         """Get current month in specified language format (e.g., 'Oca.24' or 'Jan.24')"""
-        current_date = datetime.now()
+        current_date = self.report_date or datetime.now()
         if self.language == 'tr':
             return f"{self.tr_months[current_date.month]}.{str(current_date.year)[2:]}"
         else:
@@ -396,30 +425,25 @@ class TableUpdater(BaseTableUpdater):
     def update_2023_party_table(self, survey_data: pd.DataFrame):
         """Update the 2023 party transition table (27_party_2023)"""
         try:
-            # Map current and 2023 party names
-            survey_data['mapped_party'] = survey_data['parti'].map(PARTY_MAPPING)
-            survey_data['mapped_2023_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-            
             # Define valid parties
             valid_parties = ['AK Parti', 'CHP', 'İYİ Parti', 'DEM Parti', 'MHP', 
                             'Yeniden Refah Partisi', 'Zafer Partisi', 
                             'Anahtar Parti', 'Oy kullanmayacağım', 'Kararsızım']
             
-            # Map non-valid parties to 'Diğer'
-            survey_data['mapped_party'] = survey_data['mapped_party'].apply(
-                lambda x: x if x in valid_parties else 'Diğer'
-            )
+            # Map current party names, with non-valid parties as 'Diğer'
+            current_party_mapping = {
+                answer: party if party in valid_parties else 'Diğer' for answer, party in PARTY_MAPPING.items()
+            }
             
             # Filter for relevant 2023 parties
             relevant_parties = ['AK Parti', 'CHP', 'MHP', 'İYİ Parti', 'Yeşil Sol Parti']
-            filtered_data = survey_data[survey_data['mapped_2023_party'].isin(relevant_parties)]
             
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
-                filtered_data,
-                values='duzeltilmis_agirlik',
-                index='mapped_party',
-                columns='mapped_2023_party',
+            pivot_pct = self._weighted_pivot(
+                survey_data,
+                index=('parti', current_party_mapping, 'Diğer'),
+                columns=('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023),
+                filters=(('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023, relevant_parties),),
                 calc_method='percent_of_column'
             )
             
@@ -475,16 +499,11 @@ class TableUpdater(BaseTableUpdater):
             # Find the economy question column
             econ_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
             
-            # Map party names and responses
-            survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_current_mapping)
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='mapped_party',
-                columns='econ_response',
+                index=('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023),
+                columns=(econ_col, self.econ_current_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -550,16 +569,11 @@ class TableUpdater(BaseTableUpdater):
             # Find the economy question column
             econ_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
             
-            # Map responses
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_current_mapping)
-            survey_data['Yaş grubu'] = survey_data['Yaş grubu'].replace('65 ve üstü', '65+')
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='Yaş grubu',
-                columns='econ_response',
+                index=('Yaş grubu', self.age_group_mapping, None, True),
+                columns=(econ_col, self.econ_current_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -626,15 +640,11 @@ class TableUpdater(BaseTableUpdater):
             # Find the economy question column
             econ_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
             
-            # Map responses
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_current_mapping)
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='education',
-                columns='econ_response',
+                index=('education', None),
+                columns=(econ_col, self.econ_current_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -699,16 +709,11 @@ class TableUpdater(BaseTableUpdater):
             econ_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
             print("found econ_col")
             
-            # Map party names and responses
-            survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_future_mapping)
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='mapped_party',
-                columns='econ_response',
+                index=('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023),
+                columns=(econ_col, self.econ_future_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -775,16 +780,11 @@ class TableUpdater(BaseTableUpdater):
             # Find the economy question column
             econ_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
             
-            # Map responses
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_future_mapping)
-            survey_data['Yaş grubu'] = survey_data['Yaş grubu'].replace('65 ve üstü', '65+')
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='Yaş grubu',
-                columns='econ_response',
+                index=('Yaş grubu', self.age_group_mapping, None, True),
+                columns=(econ_col, self.econ_future_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -851,16 +851,11 @@ class TableUpdater(BaseTableUpdater):
             current_col = self._find_column(survey_data, "Bugün itibari ile ekonominin nasıl olduğunu düşünüyorsunuz")
             future_col = self._find_column(survey_data, "Önümüzdeki bir yıl içerisinde ekonominin nasıl olacağını düşünüyorsunuz")
             
-            # Map responses
-            survey_data['current_response'] = survey_data[current_col].map(self.econ_current_mapping)
-            survey_data['future_response'] = survey_data[future_col].map(self.econ_future_mapping)
-            
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='current_response',
-                columns='future_response',
+                index=(current_col, self.econ_current_mapping),
+                columns=(future_col, self.econ_future_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -913,25 +908,19 @@ class TableUpdater(BaseTableUpdater):
                 'Geçtiğimiz ay gelirim giderlerimin üzerinde oldu.': 'Üzerinde oldu',
                 'Geçtiğimiz ay gelirim giderlerimi fazlasıyla karşıladı.': 'Fazlasıyla karşıladı'
             }
-            survey_data['subsistence_response'] = survey_data[subsistence_col].map(response_mapping)
-            
-            # Update age group values
-            survey_data['Yaş grubu'] = survey_data['Yaş grubu'].replace('65 ve üstü', '65+')
             
             # Create pivot tables for gender and age
-            gender_pivot = self._create_pivot_table(
+            gender_pivot = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='subsistence_response',
-                columns='Katılımcının cinsiyeti?',
+                index=(subsistence_col, response_mapping),
+                columns=('Katılımcının cinsiyeti?', None),
                 calc_method='percent_of_column'
             )
             
-            age_pivot = self._create_pivot_table(
+            age_pivot = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='subsistence_response',
-                columns='Yaş grubu',
+                index=(subsistence_col, response_mapping),
+                columns=('Yaş grubu', self.age_group_mapping, None, True),
                 calc_method='percent_of_column'
             )
             
@@ -994,30 +983,26 @@ class TableUpdater(BaseTableUpdater):
             # Find the subsistence question column
             subsistence_col = self._find_column(survey_data, "Aşağıdaki sayılan ifadelerden hangisine katılırsınız")
             
-            # Map responses and party names
+            # Map responses
             response_mapping = {
                 'Geçtiğimiz ay gelirim giderlerimi karşılamadı.': 'Karşılamadı',
                 'Geçtiğimiz ay gelirim giderlerimi ucu ucuna karşıladı.': 'Ucu ucuna karşıladı',
                 'Geçtiğimiz ay gelirim giderlerimin üzerinde oldu.': 'Üzerinde oldu',
                 'Geçtiğimiz ay gelirim giderlerimi fazlasıyla karşıladı.': 'Fazlasıyla karşıladı'
             }
-            survey_data['subsistence_response'] = survey_data[subsistence_col].map(response_mapping)
-            survey_data['mapped_party'] = survey_data['2023 Genel Seçimlerinde hangi partiye oy verdiniz?'].map(self.party_mapping_2023)
             
             # Create pivot tables for party and education
-            party_pivot = self._create_pivot_table(
+            party_pivot = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='subsistence_response',
-                columns='mapped_party',
+                index=(subsistence_col, response_mapping),
+                columns=('2023 Genel Seçimlerinde hangi partiye oy verdiniz?', self.party_mapping_2023),
                 calc_method='percent_of_column'
             )
             
-            education_pivot = self._create_pivot_table(
+            education_pivot = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='subsistence_response',
-                columns='education',
+                index=(subsistence_col, response_mapping),
+                columns=('education', None),
                 calc_method='percent_of_column'
             )
             
@@ -1088,17 +1073,14 @@ class TableUpdater(BaseTableUpdater):
                 'Geçtiğimiz ay gelirim giderlerimin üzerinde oldu.': 'Üzerinde oldu',
                 'Geçtiğimiz ay gelirim giderlerimi fazlasıyla karşıladı.': 'Fazlasıyla karşıladı'
             }
-            survey_data['subsistence_response'] = survey_data[subsistence_col].map(response_mapping)
             
             # Find jobs column and create pivot table
             jobs_col = self._find_column(survey_data, "Mevcut çalışma durumunuzu belirtir misiniz?")
-            survey_data['job_status'] = survey_data[jobs_col]
             
-            jobs_pivot = self._create_pivot_table(
+            jobs_pivot = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='subsistence_response',
-                columns='job_status',
+                index=(subsistence_col, response_mapping),
+                columns=(jobs_col, None),
                 calc_method='percent_of_column'
             )
             
@@ -1149,17 +1131,12 @@ class TableUpdater(BaseTableUpdater):
             
             # Find jobs column and create pivot table
             jobs_col = self._find_column(survey_data, "Mevcut çalışma durumunuzu belirtir misiniz?")
-            survey_data['job_status'] = survey_data[jobs_col]
-            
-            # Map responses
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_current_mapping)
             
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='job_status',
-                columns='econ_response',
+                index=(jobs_col, None),
+                columns=(econ_col, self.econ_current_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -1229,17 +1206,12 @@ class TableUpdater(BaseTableUpdater):
             
             # Find jobs column and create pivot table
             jobs_col = self._find_column(survey_data, "Mevcut çalışma durumunuzu belirtir misiniz?")
-            survey_data['job_status'] = survey_data[jobs_col]
-            
-            # Map responses
-            survey_data['econ_response'] = survey_data[econ_col].map(self.econ_future_mapping)
             
             # Create pivot table
-            pivot_pct = self._create_pivot_table(
+            pivot_pct = self._weighted_pivot(
                 survey_data,
-                values='duzeltilmis_agirlik',
-                index='job_status',
-                columns='econ_response',
+                index=(jobs_col, None),
+                columns=(econ_col, self.econ_future_mapping),
                 calc_method='percent_of_row'
             )
             
@@ -0,0 +1,131 @@
+# utils/workspace.py
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Tuple
+
+class WorkspaceManager:
+    """
+    Hand out one private directory per report run, grouped by session:
+
+        <root>/<session id>/<run id>/
+
+    Concurrent runs never share paths. A workspace is removed when its run
+    finishes; the janitor also evicts workspaces left behind by crashed or
+    killed runs once they pass max_age_seconds, and evicts the oldest
+    inactive workspaces whenever the root grows beyond quota_bytes.
+    """
+    def __init__(self, root: str = None, max_age_seconds: float = 6 * 3600, quota_bytes: int = 2 * 1024 ** 3):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'survey_report_workspaces')
+        self.max_age_seconds = max_age_seconds
+        self.quota_bytes = quota_bytes
+        self._active = set()
+        self._lock = threading.Lock()
+        self._janitor = None
+        os.makedirs(self.root, exist_ok=True)
+
+    @contextmanager
+    def workspace(self, session_id: str):
+        """Create a workspace for one run and remove it when the run is done"""
+        self.sweep()
+        # Session ids come from the client side; keep only characters safe in a path
+        session_dir = re.sub(r'[^A-Za-z0-9_-]', '_', session_id or 'anonymous')
+        path = os.path.join(self.root, session_dir, uuid.uuid4().hex)
+        # Mark active before creating so a concurrent sweep never evicts it
+        with self._lock:
+            self._active.add(path)
+        try:
+            try:
+                os.makedirs(path)
+            except FileNotFoundError:
+                # A concurrent sweep removed the (empty) session directory mid-creation
+                os.makedirs(path)
+            yield path
+        finally:
+            with self._lock:
+                self._active.discard(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _list_workspaces(self) -> List[Tuple[float, int, str]]:
+        """Return (last modified, size in bytes, path) of every workspace, oldest first"""
+        workspaces = []
+        for session_dir in os.scandir(self.root):
+            if not session_dir.is_dir():
+                continue
+            try:
+                run_dirs = list(os.scandir(session_dir.path))
+            except FileNotFoundError:
+                # Removed by a concurrent sweep
+                continue
+            for run_dir in run_dirs:
+                try:
+                    if not run_dir.is_dir():
+                        continue
+                    size, mtime = 0, run_dir.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                for dirpath, _, filenames in os.walk(run_dir.path):
+                    for filename in filenames:
+                        try:
+                            stat = os.stat(os.path.join(dirpath, filename))
+                        except OSError:
+                            continue
+                        size += stat.st_size
+                        mtime = max(mtime, stat.st_mtime)
+                workspaces.append((mtime, size, run_dir.path))
+        return sorted(workspaces)
+
+    def sweep(self):
+        """Evict expired workspaces, then the oldest inactive ones until under quota"""
+        try:
+            workspaces = self._list_workspaces()
+        except OSError as e:
+            print(f"Error scanning workspaces in {self.root}: {str(e)}")
+            return
+
+        with self._lock:
+            active = set(self._active)
+
+        cutoff = time.time() - self.max_age_seconds
+        total = sum(size for _, size, _ in workspaces)
+        for mtime, size, path in workspaces:
+            if path in active:
+                continue
+            if mtime < cutoff or total > self.quota_bytes:
+                print(f"Evicting workspace: {path}")
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+        # Drop session directories that no longer hold any run; a concurrent
+        # sweep may have removed them already
+        try:
+            for session_dir in os.scandir(self.root):
+                try:
+                    if session_dir.is_dir() and not os.listdir(session_dir.path):
+                        os.rmdir(session_dir.path)
+                except OSError:
+                    continue
+        except OSError as e:
+            print(f"Error removing empty session directories in {self.root}: {str(e)}")
+
+    def start_janitor(self, interval_seconds: float = 300):
+        """Sweep periodically on a daemon thread (idempotent)"""
+        if self._janitor is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                # One failed sweep must not stop the janitor for the life of the process
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error in workspace janitor: {str(e)}")
+
+        self._janitor = threading.Thread(target=run, name='workspace-janitor', daemon=True)
+        self._janitor.start()